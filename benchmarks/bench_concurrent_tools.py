@@ -0,0 +1,91 @@
+"""
+Throughput of N simultaneous fetch tool calls on one server process.
+
+Dispatches the calls through FastMCP.call_tool exactly as the server would,
+once for fetch_arxiv_papers (thread-staged pipeline) and once for
+fetch_arxiv_papers_async (async downloads and model calls), against local
+fixture PDFs and the local model backend.
+By default every call fetches a different paper with the caches off, so each
+one does the full work; --same-paper keeps the default cache settings and has
+all calls fetch one paper, which measures how well duplicate work is shared.
+
+    python -m benchmarks.bench_concurrent_tools --calls 8 --model-latency 0.2
+    python -m benchmarks.bench_concurrent_tools --calls 8 --same-paper
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=8, help="simultaneous tool calls")
+    parser.add_argument('--model-latency', type=float, default=0.2, help="seconds per fake model call")
+    parser.add_argument('--http-latency', type=float, default=0.05, help="seconds per PDF request")
+    parser.add_argument('--same-paper', action='store_true', help="all calls fetch one paper, caches on")
+    args = parser.parse_args()
+
+    # Offline run on the local model backend; caches off unless measuring shared work on one paper
+    os.environ['MODEL_BACKEND'] = 'local'
+    if not args.same_paper:
+        os.environ['LLM_CACHE_ENABLED'] = '0'
+        os.environ['PDF_TEXT_CACHE_ENABLED'] = '0'
+
+    from benchmarks.fixtures import make_corpus, serve_directory
+    from src.utils.model_backend import LocalModel, set_model
+
+    workdir = Path(tempfile.mkdtemp(prefix='bench-concurrent-'))
+    corpus = make_corpus(workdir / 'corpus', args.calls * 2)
+    server = serve_directory(workdir / 'corpus', args.http_latency)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    model = LocalModel(latency=args.model_latency)
+    set_model(model)
+
+    from src.server.mcp_server import mcp
+    import src.tools.arxiv_fetcher as arxiv_fetcher
+
+    def fixture_search(keywords, max_results, author):
+        # One paper per keyword; with --same-paper all calls of a run share one keyword
+        path = corpus[int(keywords)]
+        yield {
+            "arxiv_id": path.name,
+            "title": keywords,
+            "authors": "Fixture Author",
+            "pdf_url": f"{base_url}/{path.name}"
+        }
+
+    arxiv_fetcher._iter_matching_papers = fixture_search
+    os.chdir(workdir)
+
+    async def run(tool: str, offset: int) -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            mcp.call_tool(tool, {"keywords": str(offset if args.same_paper else offset + i), "max_results": 1})
+            for i in range(args.calls)
+        ])
+        return time.perf_counter() - start
+
+    results = {}
+    for tool, offset in (("fetch_arxiv_papers", 0), ("fetch_arxiv_papers_async", args.calls)):
+        calls_before = model.calls
+        elapsed = asyncio.run(run(tool, offset))
+        results[tool] = elapsed
+        print(
+            f"{tool:<26} {args.calls} calls in {elapsed:6.2f}s  "
+            f"{args.calls / elapsed:6.2f} calls/s  "
+            f"{(model.calls - calls_before) / args.calls:.1f} model calls/paper"
+        )
+
+    print(f"speedup: {results['fetch_arxiv_papers'] / results['fetch_arxiv_papers_async']:.1f}x")
+    server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
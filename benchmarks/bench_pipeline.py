@@ -0,0 +1,273 @@
+"""
+End-to-end benchmark for the fetch -> extract -> template -> analyze -> summarize pipeline.
+
+Runs fetch_arxiv_papers and generate_comprehensive_analysis entirely offline:
+a synthetic PDF corpus served over local HTTP, a fixture arXiv client and the
+local model backend. Reports per-stage wall time, throughput, peak RSS and
+model calls per paper, and writes JSON that can be compared across commits.
+
+    python -m benchmarks.bench_pipeline --papers 20
+    python -m benchmarks.bench_pipeline --papers 20 --compare benchmarks/results/<commit>.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from benchmarks.fixtures import make_arxiv_client, make_corpus, serve_directory
+
+
+RESULTS_DIR = Path(__file__).parent / 'results'
+FIXTURE_TITLE = "Fixture Paper On Efficient Attention"
+
+
+class StageTimer:
+    """Accumulates wall time per named stage across threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stage = self.stages.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stage["count"] += 1
+            stage["total_seconds"] += seconds
+            stage["max_seconds"] = max(stage["max_seconds"], seconds)
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return timed
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: dict(stage, mean_seconds=stage["total_seconds"] / stage["count"])
+            for name, stage in self.stages.items()
+        }
+
+
+class PeakRSS:
+    """Samples this process's resident set size while the block runs."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def _current(self) -> int:
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * self._page_size
+        except OSError:
+            # ru_maxrss is in KiB on Linux; lifetime peak rather than per-block
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self._current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRSS":
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self._current())
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(name: str, papers: int, model: Any, timer: StageTimer, body: Callable[[], Any]) -> Dict[str, Any]:
+    from src.utils.metrics import metrics
+
+    metrics.reset()
+    calls_before = model.calls
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        body()
+        wall = time.perf_counter() - start
+    calls = model.calls - calls_before
+    result = {
+        "papers": papers,
+        "wall_seconds": round(wall, 4),
+        "papers_per_minute": round(papers / wall * 60, 2) if wall else None,
+        "model_calls": calls,
+        "model_calls_per_paper": round(calls / papers, 2) if papers else None,
+        "peak_rss_mb": round(rss.peak_bytes / 2 ** 20, 1),
+        "children_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "stages": timer.report(),
+        "metrics": metrics.snapshot()
+    }
+    print(
+        f"{name:<22} {papers:>3} papers  {wall:7.2f}s  {result['papers_per_minute']:8.1f} papers/min  "
+        f"{result['model_calls_per_paper']:5.1f} calls/paper  peak RSS {result['peak_rss_mb']} MB"
+    )
+    for stage, stats in result["stages"].items():
+        print(f"    {stage:<32} n={stats['count']:<4} total={stats['total_seconds']:7.2f}s  mean={stats['mean_seconds']:.3f}s")
+    return result
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = Path(tempfile.mkdtemp(prefix='bench-pipeline-'))
+    os.environ['MODEL_BACKEND'] = 'local'
+    os.environ['LLM_CACHE_PATH'] = str(workdir / 'pdfs' / 'llm_cache.sqlite3')
+    os.chdir(workdir)
+
+    corpus = make_corpus(workdir / 'corpus', args.papers, args.pages)
+    server = serve_directory(workdir / 'corpus', args.http_latency)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    import arxiv
+    from src.utils.model_backend import LocalModel, set_model
+    from src.utils.llm_cache import get_llm_cache
+    from src.utils.template_store import get_template_store
+    import src.tools.arxiv_fetcher as arxiv_fetcher
+    import src.tools.template_selector as template_selector
+
+    model = LocalModel(
+        latency=args.model_latency,
+        tokens_per_second=args.tokens_per_second,
+        failure_rate=args.failure_rate
+    )
+    set_model(model)
+    arxiv.Client = make_arxiv_client(corpus, base_url, FIXTURE_TITLE, noise=args.noise)
+
+    fetch_stages = ["_download_stage", "_extract_stage", "_templates_stage", "_analyze_stage", "_summarize_stage"]
+    originals = {name: getattr(arxiv_fetcher, name) for name in fetch_stages}
+    selector_originals = {
+        name: getattr(template_selector, name)
+        for name in ("generate_dynamic_templates", "analyze_with_templates")
+    }
+
+    def instrument(timer: StageTimer) -> None:
+        for name, func in originals.items():
+            setattr(arxiv_fetcher, name, timer.wrap(name.strip('_').replace('_stage', ''), func))
+        for name, func in selector_originals.items():
+            setattr(template_selector, name, timer.wrap(name, func))
+
+    def fetch() -> None:
+        papers = asyncio.run(arxiv_fetcher.fetch_arxiv_papers(FIXTURE_TITLE, max_results=args.papers + args.noise))
+        errors = [paper for paper in papers if "error" in paper]
+        if len(papers) != args.papers or errors:
+            raise RuntimeError(f"Expected {args.papers} summarized papers, got {len(papers)} ({len(errors)} errors)")
+
+    scenarios: Dict[str, Any] = {}
+
+    timer = StageTimer()
+    instrument(timer)
+    scenarios["fetch_cold"] = measure("fetch_cold", args.papers, model, timer, fetch)
+
+    timer = StageTimer()
+    instrument(timer)
+    scenarios["fetch_warm"] = measure("fetch_warm", args.papers, model, timer, fetch)
+
+    texts = [arxiv_fetcher.extract_pdf_text(str(workdir / 'pdfs' / path.name)) for path in corpus]
+    cache = get_llm_cache()
+    if cache is not None:
+        cache.clear()
+    store = get_template_store()
+    if store is not None:
+        store.clear()
+    timer = StageTimer()
+    instrument(timer)
+
+    def comprehensive() -> None:
+        for path, text in zip(corpus, texts):
+            start = time.perf_counter()
+            template_selector.generate_comprehensive_analysis(text, path.name)
+            timer.record("generate_comprehensive_analysis", time.perf_counter() - start)
+
+    scenarios["comprehensive_cold"] = measure("comprehensive_cold", args.papers, model, timer, comprehensive)
+
+    server.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "python": sys.version.split()[0],
+        "config": {
+            "papers": args.papers,
+            "pages": args.pages,
+            "noise": args.noise,
+            "model_latency": args.model_latency,
+            "tokens_per_second": args.tokens_per_second,
+            "failure_rate": args.failure_rate,
+            "http_latency": args.http_latency,
+            "env": {k: v for k, v in os.environ.items() if k.endswith(('_CONCURRENCY', '_WORKERS', '_SUMMARY'))}
+        },
+        "scenarios": scenarios
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print wall time / throughput / call deltas against a previous result file."""
+    print(f"\ncompared with {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for metric in ("wall_seconds", "papers_per_minute", "model_calls_per_paper", "peak_rss_mb"):
+            old, new = before.get(metric), now.get(metric)
+            if old in (None, 0) or new is None:
+                continue
+            print(f"    {name:<20} {metric:<22} {old:>10} -> {new:<10} ({(new - old) / old * 100:+.1f}%)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--papers', type=int, default=20)
+    parser.add_argument('--pages', type=int, default=12, help="pages per fixture PDF")
+    parser.add_argument('--noise', type=int, default=2, help="non-matching search results mixed in")
+    parser.add_argument('--model-latency', type=float, default=0.1, help="seconds per model call")
+    parser.add_argument('--tokens-per-second', type=float, default=0, help="local model output throughput, 0 = unlimited")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of model calls that fail")
+    parser.add_argument('--http-latency', type=float, default=0.05, help="seconds per PDF request")
+    parser.add_argument('--output', type=Path, help="result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', type=Path, help="previous result file to diff against")
+    args = parser.parse_args()
+    logging.basicConfig(stream=sys.stderr, level=logging.WARNING)
+
+    output = args.output.resolve() if args.output else None
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+
+    result = run(args)
+
+    output = output or RESULTS_DIR / f"{result['commit'] or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"\nresults written to {output}")
+    if baseline:
+        compare(result, baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Cold start to MCP handshake, the way an MCP host launches the server.
+
+Spawns `python main.py` over stdio for each run and times the initialize
+handshake and the first tools/list. Also reports how long importing main
+takes and which heavy dependencies that import pulls in (ideally none:
+they load on first use).
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("google.generativeai", "arxiv", "pypdf", "requests", "numpy")
+
+_IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+print(json.dumps({{
+    "import_seconds": time.perf_counter() - start,
+    "heavy_modules": [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+}}))
+"""
+
+
+async def time_handshake(env: Dict[str, str], cwd: str) -> Dict[str, float]:
+    params = StdioServerParameters(command=sys.executable, args=[str(REPO_ROOT / 'main.py')], env=env, cwd=cwd)
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as errlog:
+        async with stdio_client(params, errlog=errlog) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                handshake = time.perf_counter() - start
+                tools = await session.list_tools()
+                listed = time.perf_counter() - start
+    return {"handshake": handshake, "tools_list": listed, "tools": len(tools.tools)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="server launches to time")
+    args = parser.parse_args()
+
+    # No API key needed to start; a scratch directory keeps job resumption out of the measurement
+    workdir = tempfile.mkdtemp(prefix='bench-startup-')
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT), LOG_LEVEL='WARNING')
+    env.pop('GEMINI_API_KEY', None)
+
+    probe = subprocess.run(
+        [sys.executable, '-c', _IMPORT_PROBE], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    imported = json.loads(probe.stdout.strip().splitlines()[-1])
+    print(f"import main               {imported['import_seconds']:6.3f}s")
+    print(f"heavy modules at startup  {', '.join(imported['heavy_modules']) or 'none'}")
+
+    runs: List[Dict[str, float]] = [asyncio.run(time_handshake(env, workdir)) for _ in range(args.runs)]
+    for key in ("handshake", "tools_list"):
+        values = [run[key] for run in runs]
+        print(
+            f"{key:<25} {statistics.median(values):6.3f}s median  "
+            f"{min(values):6.3f}s min  {max(values):6.3f}s max  ({args.runs} runs, {runs[0]['tools']} tools)"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Offline fixtures shared by the benchmarks: synthetic paper PDFs and a local
+HTTP server to download them from. The model side uses
+src.utils.model_backend.LocalModel.
+"""
+
+import functools
+import http.server
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+
+SECTION_WORDS = (
+    "transformer attention layer gradient optimization latency throughput dataset "
+    "benchmark accuracy architecture embedding inference training loss convergence"
+).split()
+
+
+def _escape(line: str) -> str:
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path: Path, pages: List[str]) -> None:
+    """Write a minimal text-only PDF with one content stream per page."""
+    count = len(pages)
+    font_ref = 3 + 2 * count
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join(f"{3 + 2 * i} 0 R" for i in range(count)), count
+        ),
+    ]
+    for i, page in enumerate(pages):
+        lines = " ".join(f"({_escape(line)}) '" for line in page.split("\n"))
+        body = f"BT /F1 9 Tf 40 760 Td 11 TL {lines} ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_ref} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+
+
+def make_corpus(directory: Path, papers: int, pages: int = 12) -> List[Path]:
+    """Generate papers synthetic PDFs named like arXiv downloads (2501.000NNv1)."""
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for n in range(papers):
+        page_texts = []
+        for p in range(pages):
+            words = [SECTION_WORDS[(n * 7 + p * 3 + w) % len(SECTION_WORDS)] for w in range(14)]
+            heading = ["Abstract", "1 Introduction", "2 Method", "3 Experiments", "4 Conclusion"][min(p, 4)]
+            page_texts.append(heading + "\n" + "\n".join(" ".join(words) for _ in range(60)))
+        path = directory / f"2501.{n:05d}v1"
+        write_pdf(path, page_texts)
+        paths.append(path)
+    return paths
+
+
+def serve_directory(directory: Path, latency: float = 0.0) -> http.server.ThreadingHTTPServer:
+    """Serve directory over HTTP on 127.0.0.1, adding latency seconds per request."""
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            time.sleep(latency)
+            super().do_GET()
+
+    server = http.server.ThreadingHTTPServer(
+        ('127.0.0.1', 0), functools.partial(Handler, directory=str(directory))
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FixtureAuthor:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class FixtureResult:
+    """The subset of arxiv.Result the fetcher reads."""
+
+    def __init__(self, short_id: str, title: str, pdf_url: str):
+        self._short_id = short_id
+        self.title = title
+        self.pdf_url = pdf_url
+        self.authors = [FixtureAuthor("Fixture Author"), FixtureAuthor("Second Author")]
+
+    def get_short_id(self) -> str:
+        return self._short_id
+
+
+def make_arxiv_client(corpus: List[Path], base_url: str, title: str, noise: int = 0):
+    """
+    Build a drop-in replacement for arxiv.Client serving the fixture corpus.
+    Every corpus paper carries the given title; noise extra results with a
+    different title are interleaved to exercise the title filter.
+    """
+
+    class FixtureArxivClient:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def results(self, search):
+            emitted = 0
+            for index, path in enumerate(corpus):
+                if emitted >= search.max_results:
+                    return
+                yield FixtureResult(path.name, title, f"{base_url}/{path.name}")
+                emitted += 1
+                if index < noise and emitted < search.max_results:
+                    yield FixtureResult(f"9999.{index:05d}v1", f"{title} revisited", f"{base_url}/missing")
+                    emitted += 1
+
+    return FixtureArxivClient
@@ -1,8 +1,19 @@
+import argparse
+
+from src.utils.env import init_process
+
+# Before any module reads its configuration from the environment
+init_process()
+
 # Importing automatically registers tools and prompts via decorators
-from src.server.mcp_server import mcp
-import src.tools.arxiv_fetcher
-import src.prompts.templates
-import src.prompts.fallback
+import src.server.components
+from src.server.instances import MCP_HOST, MCP_INSTANCES, MCP_PORT, MCP_TRANSPORT, TRANSPORTS, run_server
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
+    parser = argparse.ArgumentParser(description="Research paper summarizer MCP server.")
+    parser.add_argument('--transport', choices=TRANSPORTS, default=MCP_TRANSPORT)
+    parser.add_argument('--instances', type=int, default=MCP_INSTANCES, help="server processes (HTTP transports only)")
+    parser.add_argument('--host', default=MCP_HOST)
+    parser.add_argument('--port', type=int, default=MCP_PORT, help="shared port, or first port for sse instances")
+    args = parser.parse_args()
+    run_server(args.transport, args.instances, args.host, args.port)
@@ -0,0 +1,86 @@
+"""
+Prompt rendering.
+Prompt templates are compiled once into literal text and placeholder slots,
+so rendering is a single join and substituted values (paper text, analyses)
+are inserted verbatim: braces in them can't break rendering. Shared per-paper
+context such as the analyses block is serialized once in a compact form and
+reused across prompts. Every render records the prompt's size.
+"""
+
+import logging
+import re
+from typing import Dict, List, Tuple, Union
+
+from src.utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Prompt sizes in characters
+PROMPT_SIZE_BUCKETS = (500.0, 1000.0, 2000.0, 4000.0, 8000.0, 16000.0, 32000.0, 64000.0, 128000.0)
+
+_PLACEHOLDER = re.compile(r'\{\{|\}\}|\{(\w+)\}')
+
+
+def record_prompt_size(name: str, prompt: str) -> None:
+    metrics.observe("prompt_chars", len(prompt), buckets=PROMPT_SIZE_BUCKETS, prompt=name)
+    logger.debug(f"Rendered {name} prompt: {len(prompt)} chars")
+
+
+class PromptTemplate:
+    """
+    A str.format-style template ({name} slots, {{ and }} for literal braces)
+    parsed once at import time.
+    """
+
+    def __init__(self, name: str, template: str):
+        self.name = name
+        self._parts: List[Union[str, Tuple[str]]] = []
+        literal: List[str] = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(template):
+            literal.append(template[position:match.start()])
+            if match.group(1) is None:
+                literal.append(match.group(0)[0])
+            else:
+                self._parts.append("".join(literal))
+                self._parts.append((match.group(1),))
+                literal = []
+            position = match.end()
+        literal.append(template[position:])
+        self._parts.append("".join(literal))
+        self.fields = frozenset(part[0] for part in self._parts if isinstance(part, tuple))
+
+    def render(self, **values: str) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt '{self.name}' is missing values for: {', '.join(sorted(missing))}")
+        prompt = "".join(values[part[0]] if isinstance(part, tuple) else part for part in self._parts)
+        record_prompt_size(self.name, prompt)
+        return prompt
+
+
+def render_template_prompt(template_prompt: str, text: str, name: str = "analysis") -> str:
+    """
+    Fill a model-generated analysis template with paper text. Only the literal
+    {text} placeholder is substituted, so any other braces the model wrote are
+    kept as-is; a template without the placeholder gets the text appended.
+    """
+    if "{text}" in template_prompt:
+        prompt = template_prompt.replace("{text}", text)
+    else:
+        prompt = f"{template_prompt.rstrip()}\n\nPaper text:\n{text}"
+    record_prompt_size(name, prompt)
+    return prompt
+
+
+def format_analyses(analyses: Dict[str, str]) -> str:
+    """
+    Compact, prompt-ready rendering of template analyses, produced once per
+    paper and shared by the selection, summary and executive prompts. Plain
+    headed sections avoid the quoting, escaping and indentation of JSON.
+    """
+    return "\n\n".join(
+        f"=== {name} ===\n{analysis.strip()}"
+        for name, analysis in analyses.items()
+    )
@@ -3,6 +3,11 @@ Prompt templates for dynamic analysis generation and summarization.
 These prompts guide Gemini in analyzing and summarizing research papers.
 """
 
+from typing import List
+
+from src.prompts.rendering import PromptTemplate
+from src.utils.chunking import SUMMARY_CONTEXT_TOKENS, overview_context, template_context
+
 
 # Meta-prompt for generating custom analysis templates
 TEMPLATE_GENERATION_PROMPT = """
@@ -112,14 +117,51 @@ Focus on:
 """
 
 
+# Prompt for producing selection and all summaries in a single structured call
+COMBINED_SUMMARY_PROMPT = """
+You are analyzing a research paper. You have multiple analyses of it, each written from a different analytical perspective (template).
+
+Paper text:
+{paper_text}
+
+Available templates and their analyses:
+{analyses}
+
+Complete all of the following tasks:
+1. **selected_template**: Choose the template whose analysis provides the MOST valuable insights for understanding this paper. Must be exactly one of: {template_names}
+2. **reasoning**: Explain why this aspect is most critical for this specific paper.
+3. **focused_summary**: A comprehensive, well-structured summary (300-500 words) focused on the selected aspect that clearly explains the main contribution, uses clear technical language, and provides specific details and insights for researchers in this field.
+4. **holistic_summary**: A holistic summary (400-600 words) synthesizing all analyses, with clear sections for Overview, Architecture & Design, Mathematical Foundations, Key Advantages, Limitations & Trade-offs and Future Directions.
+5. **executive_summary**: A brief executive summary (3-4 sentences) covering the core contribution, why it matters and key results.
+
+Respond with a single JSON object and nothing else:
+{{
+  "selected_template": "template_name",
+  "reasoning": "...",
+  "focused_summary": "...",
+  "holistic_summary": "...",
+  "executive_summary": "..."
+}}
+"""
+
+
+# Compiled once; rendering substitutes values verbatim
+_TEMPLATE_GENERATION = PromptTemplate("template_generation", TEMPLATE_GENERATION_PROMPT)
+_TEMPLATE_SELECTION = PromptTemplate("selection", TEMPLATE_SELECTION_PROMPT)
+_FOCUSED_SUMMARY = PromptTemplate("focused_summary", FOCUSED_SUMMARY_PROMPT)
+_HOLISTIC_SUMMARY = PromptTemplate("holistic_summary", HOLISTIC_SUMMARY_PROMPT)
+_EXECUTIVE_SUMMARY = PromptTemplate("executive_summary", EXECUTIVE_SUMMARY_PROMPT)
+_COMBINED_SUMMARY = PromptTemplate("combined_summary", COMBINED_SUMMARY_PROMPT)
+
+
 def get_template_generation_prompt(paper_text: str) -> str:
     """Returns formatted prompt for generating dynamic templates."""
-    return TEMPLATE_GENERATION_PROMPT.format(text=paper_text)
+    return _TEMPLATE_GENERATION.render(text=paper_text)
 
 
 def get_template_selection_prompt(analyses: str) -> str:
     """Returns formatted prompt for selecting best template."""
-    return TEMPLATE_SELECTION_PROMPT.format(analyses=analyses)
+    return _TEMPLATE_SELECTION.render(analyses=analyses)
 
 
 def get_focused_summary_prompt(
@@ -129,9 +171,9 @@ def get_focused_summary_prompt(
 ) -> str:
     """Returns formatted prompt for generating focused summary."""
     aspect_name = selected_template.replace('_', ' ')
-    return FOCUSED_SUMMARY_PROMPT.format(
+    return _FOCUSED_SUMMARY.render(
         selected_template=selected_template,
-        paper_text=paper_text[:6000],
+        paper_text=template_context(paper_text, selected_template, budget_tokens=SUMMARY_CONTEXT_TOKENS),
         selected_analysis=selected_analysis,
         aspect_name=aspect_name
     )
@@ -139,9 +181,18 @@ def get_focused_summary_prompt(
 
 def get_holistic_summary_prompt(all_analyses: str) -> str:
     """Returns formatted prompt for generating holistic summary."""
-    return HOLISTIC_SUMMARY_PROMPT.format(all_analyses=all_analyses)
+    return _HOLISTIC_SUMMARY.render(all_analyses=all_analyses)
 
 
 def get_executive_summary_prompt(analyses: str) -> str:
     """Returns formatted prompt for generating executive summary."""
-    return EXECUTIVE_SUMMARY_PROMPT.format(analyses=analyses)
+    return _EXECUTIVE_SUMMARY.render(analyses=analyses)
+
+
+def get_combined_summary_prompt(paper_text: str, analyses: str, template_names: List[str]) -> str:
+    """Returns formatted prompt for the single-call selection and summaries."""
+    return _COMBINED_SUMMARY.render(
+        paper_text=overview_context(paper_text, SUMMARY_CONTEXT_TOKENS),
+        analyses=analyses,
+        template_names=", ".join(template_names)
+    )
@@ -0,0 +1,11 @@
+"""
+Importing this module registers every tool, resource and prompt on the
+shared mcp instance. Entry points (main.py, server instances) import it once.
+"""
+
+import src.tools.arxiv_fetcher
+import src.tools.stats
+import src.tools.jobs
+import src.tools.search
+import src.prompts.templates
+import src.prompts.fallback
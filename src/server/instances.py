@@ -0,0 +1,107 @@
+"""
+Running the server over stdio or HTTP, as one or several instances.
+stdio serves a single client. Over HTTP, several instances (processes) can
+be started from one entry point:
+- streamable-http: every instance accepts on one shared listening socket and
+  runs stateless, so any instance can serve any request;
+- sse: SSE sessions live in the instance that opened them, so instance i
+  listens on port + i.
+Instances share the PDF, text and LLM caches under ./pdfs (see
+src/utils/file_lock.py) and the job queue; instance i works on shard i of
+the queued papers.
+"""
+
+import logging
+import multiprocessing
+import os
+import socket
+from typing import List, Optional
+
+from src.server.mcp_server import mcp
+
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ("stdio", "sse", "streamable-http")
+MCP_TRANSPORT = os.getenv('MCP_TRANSPORT', 'stdio')
+MCP_HOST = os.getenv('MCP_HOST', '127.0.0.1')
+MCP_PORT = int(os.getenv('MCP_PORT', '8000'))
+MCP_INSTANCES = int(os.getenv('MCP_INSTANCES', '1'))
+
+
+def serve_instance(
+    index: int,
+    count: int,
+    transport: str,
+    host: str,
+    port: int,
+    sock: Optional[socket.socket] = None
+) -> None:
+    """Run one HTTP instance; with a sock, accept on that shared listening socket instead of binding."""
+    import uvicorn
+
+    import src.server.components
+    import src.tools.jobs
+
+    src.tools.jobs.set_shard(index, count)
+    if count > 1:
+        # Every instance works its shard of the queue, not only those that received a submission
+        src.tools.jobs.ensure_workers()
+    else:
+        src.tools.jobs.resume_pending_jobs()
+
+    mcp.settings.host = host
+    mcp.settings.port = port
+    if transport == "streamable-http":
+        mcp.settings.stateless_http = count > 1
+        app = mcp.streamable_http_app()
+    else:
+        app = mcp.sse_app()
+    config = uvicorn.Config(app, host=host, port=port, log_level=mcp.settings.log_level.lower())
+    logger.info(f"Instance {index + 1}/{count} serving {transport} on {host}:{port}")
+    uvicorn.Server(config).run(sockets=[sock] if sock is not None else None)
+
+
+def run_server(
+    transport: str = MCP_TRANSPORT,
+    instances: int = MCP_INSTANCES,
+    host: str = MCP_HOST,
+    port: int = MCP_PORT
+) -> None:
+    if transport not in TRANSPORTS:
+        raise ValueError(f"transport must be one of {', '.join(TRANSPORTS)}, got '{transport}'")
+    if transport == "stdio":
+        import src.server.components
+        import src.tools.jobs
+
+        src.tools.jobs.resume_pending_jobs()
+        mcp.run(transport="stdio")
+        return
+    if instances <= 1:
+        serve_instance(0, 1, transport, host, port)
+        return
+
+    sock = None
+    if transport == "streamable-http":
+        import uvicorn
+
+        sock = uvicorn.Config(None, host=host, port=port).bind_socket()
+
+    context = multiprocessing.get_context("spawn")
+    processes: List[multiprocessing.Process] = []
+    for index in range(instances):
+        instance_port = port if sock is not None else port + index
+        processes.append(context.Process(
+            target=serve_instance,
+            args=(index, instances, transport, host, instance_port, sock),
+            name=f"mcp-instance-{index}"
+        ))
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Instances got the same SIGINT and shut down on their own
+        for process in processes:
+            process.join()
@@ -6,4 +6,4 @@ mcp = FastMCP(
     instructions="Fetches papers from arXiv and whitepapers, provides summarizations via context-based templates."
 )
 
-'''here we can create a N number of instances and then we can run those suitable instances in the main.py'''
\ No newline at end of file
+# One instance per process; src/server/instances.py runs several processes behind one entry point
@@ -1,67 +1,183 @@
-from typing import List, Dict
-import arxiv
-import requests
-from io import BytesIO
-from pypdf import PdfReader
-from pathlib import Path
-import google.generativeai as genai
+from typing import List, Dict, Iterator, Optional, Tuple
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 import os 
-from dotenv import load_dotenv
+from mcp.server.fastmcp import Context
 from src.server.mcp_server import mcp
-from src.tools.template_selector import generate_dynamic_templates, analyze_with_templates
+from src.utils.pipeline import Stage, run_pipeline
+from src.utils.model_backend import get_model
+from src.utils.metrics import instrumented, is_error_string, metrics, timed
+from src.utils.llm_cache import cached_generate, cached_generate_async
+from src.utils.downloads import get_download_manager
+from src.utils.file_lock import AsyncKeyLock
+from src.utils.pdf_text import MAX_CHARS, MAX_PAGES, extract_text_cached, read_cached_text, text_lock_key
+from src.utils.paper_index import get_paper_index, normalize_title, parse_arxiv_id
+from src.utils.result_store import get_result_store
+from src.utils.search_index import get_search_index
+from src.tools.template_selector import (
+    generate_dynamic_templates,
+    generate_dynamic_templates_async,
+    analyze_with_templates,
+    analyze_with_templates_async,
+    executive_summary,
+    executive_summary_async
+)
 from src.prompts.templates import (
     get_template_selection_prompt,
     get_focused_summary_prompt,
-    get_holistic_summary_prompt
+    get_holistic_summary_prompt,
+    get_combined_summary_prompt
 )
+from src.prompts.rendering import format_analyses
+from src.utils.helpers import strip_code_fences
 import json
+from urllib.parse import quote, unquote
+
+
 
+# Progress and errors go to stderr via logging; stdout carries the stdio transport
+logger = logging.getLogger(__name__)
 
-# Load environment variables from .env file
-load_dotenv()
+# Per-stage worker counts for the paper pipeline in fetch_arxiv_papers
+DOWNLOAD_CONCURRENCY = int(os.getenv('DOWNLOAD_CONCURRENCY', '4'))
+EXTRACT_CONCURRENCY = int(os.getenv('EXTRACT_CONCURRENCY', '2'))
+LLM_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', '4'))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '4'))
 
-# Configure Gemini API using environment variable
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables. Please set it in your .env file.")
+# One structured call for selection + all summaries instead of three serial calls
+COMBINED_SUMMARY = os.getenv('COMBINED_SUMMARY', '1') != '0'
+COMBINED_SUMMARY_FIELDS = ("selected_template", "reasoning", "focused_summary", "holistic_summary", "executive_summary")
 
-genai.configure(api_key=GEMINI_API_KEY)
+# Result payload levels for the fetch tools; heavy fields stay available via paper://{arxiv_id}
+DETAIL_LEVELS = ("ids", "summary", "full")
+HEAVY_FIELDS = ("extracted_text_snippet", "generated_templates", "template_analyses")
 
+# IDs per arXiv id_list query, and titles OR-ed into one ti: query, in fetch_arxiv_papers_by_id
+ARXIV_ID_BATCH_SIZE = int(os.getenv('ARXIV_ID_BATCH_SIZE', '50'))
+ARXIV_TITLE_BATCH_SIZE = int(os.getenv('ARXIV_TITLE_BATCH_SIZE', '10'))
 
+
+@instrumented("download_pdf", is_error=is_error_string)
 def download_pdf(pdf_url: str, download_dir: str = "./pdfs") -> str:
-    """Download and store PDF locally."""
+    """Download and store PDF locally, reusing a valid copy from an earlier run."""
     try:
-        response = requests.get(pdf_url, timeout=20)
-        response.raise_for_status()
-        Path(download_dir).mkdir(parents=True, exist_ok=True)
-        filename = pdf_url.split('/')[-1]
-        file_path = Path(download_dir) / filename
-        with open(file_path, 'wb') as f:
-            f.write(response.content)
-        return str(file_path)
+        return get_download_manager(download_dir).fetch(pdf_url)
     except Exception as e:
         return f"Error downloading PDF: {str(e)}"
 
 
-def extract_pdf_text(local_path: str, max_pages: int = 10) -> str:
-    """Extract text from stored PDF."""
+@instrumented("extract_pdf_text", is_error=lambda result: result[1] is not None)
+def extract_pdf_text_checked(
+    local_path: str,
+    max_pages: int = MAX_PAGES,
+    max_chars: int = MAX_CHARS
+) -> Tuple[str, Optional[str]]:
+    """
+    Extract text from stored PDF, parsing pages only until max_chars is reached.
+    Results are cached in a <pdf>.txt.gz sidecar keyed by checksum and settings.
+    Returns (text, error): error is None on success, and the text is never
+    inspected for failure markers, since papers routinely contain "Error".
+    """
     try:
-        with open(local_path, 'rb') as f:
-            reader = PdfReader(BytesIO(f.read()))
-        text = "".join([page.extract_text() or "" for page in reader.pages[:max_pages]])
-        return text[:8000]  # Increased limit for better analysis
+        return extract_text_cached(local_path, max_pages, max_chars), None
     except Exception as e:
-        return f"Error extracting text: {str(e)}"
+        return "", f"Error extracting text: {str(e)}"
 
 
+def extract_pdf_text(local_path: str, max_pages: int = MAX_PAGES, max_chars: int = MAX_CHARS) -> str:
+    """extract_pdf_text_checked for callers that take the error message in place of the text."""
+    text, error = extract_pdf_text_checked(local_path, max_pages, max_chars)
+    return text if error is None else error
+
+
+def _parse_template_selection(selection_text: str, templates: Dict[str, str]) -> Tuple[str, str]:
+    """Extract (selected_template, reasoning) from the selection JSON response."""
+    selection_data = json.loads(strip_code_fences(selection_text))
+    selected_template = selection_data.get("selected_template", list(templates.keys())[0])
+    selection_reasoning = selection_data.get("reasoning", "Template selected based on content analysis")
+    return selected_template, selection_reasoning
+
+
+def _parse_combined_summary(response_text: str, templates: Dict[str, str]) -> Dict[str, str]:
+    """
+    Strictly parse the single-call summary response.
+    Raises ValueError unless every field is a non-empty string and the
+    selected template is one of the templates that were analyzed.
+    """
+    data = json.loads(strip_code_fences(response_text))
+    if not isinstance(data, dict):
+        raise ValueError("Combined summary response is not a JSON object")
+    for field in COMBINED_SUMMARY_FIELDS:
+        value = data.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"Combined summary response has no usable '{field}'")
+    if data["selected_template"] not in templates:
+        raise ValueError(f"Combined summary selected unknown template '{data['selected_template']}'")
+    return {
+        "selected_template": data["selected_template"],
+        "selection_reasoning": data["reasoning"],
+        "focused_summary": data["focused_summary"],
+        "holistic_summary": data["holistic_summary"],
+        "executive_summary": data["executive_summary"]
+    }
+
+
+def _select_template(model: Any, analyses_text: str, templates: Dict[str, str], paper_id: str) -> Tuple[str, str]:
+    try:
+        selection_text = cached_generate(model, get_template_selection_prompt(analyses_text), paper_id, "selection")
+        return _parse_template_selection(selection_text, templates)
+    except Exception as e:
+        logger.warning(f"Error in template selection: {e}")
+        return list(templates.keys())[0], "Default template selected due to selection error"
+
+
+def _focused_summary(
+    model: Any,
+    paper_text: str,
+    selected_template: str,
+    analyses: Dict[str, str],
+    paper_id: str
+) -> str:
+    primary_summary_prompt = get_focused_summary_prompt(
+        selected_template,
+        paper_text,
+        analyses.get(selected_template, "No analysis available")
+    )
+    try:
+        return cached_generate(model, primary_summary_prompt, paper_id, "focused_summary")
+    except Exception as e:
+        return f"Error generating primary summary: {str(e)}"
+
+
+def _holistic_summary(model: Any, analyses_text: str, paper_id: str) -> str:
+    try:
+        return cached_generate(model, get_holistic_summary_prompt(analyses_text), paper_id, "holistic_summary")
+    except Exception as e:
+        return f"Error generating holistic summary: {str(e)}"
+
+
+@instrumented("select_best_template_and_generate_summary")
 def select_best_template_and_generate_summary(
     paper_text: str, 
     templates: Dict[str, str], 
-    analyses: Dict[str, str]
+    analyses: Dict[str, str],
+    paper_id: str = "",
+    model: Any = None,
+    combined: Optional[bool] = None,
+    executive: bool = False
 ) -> Dict[str, str]:
     """
     Use Gemini to select the most appropriate template and generate a comprehensive summary.
+    Responses are served from the LLM cache when the same prompt was seen before.
+    
+    In combined mode (COMBINED_SUMMARY, overridable per call) selection and all
+    summaries come from one JSON-structured call; if that response fails
+    validation, or combined mode is off, separate calls are made with the
+    holistic summary running in parallel with selection -> focused summary.
+    The executive summary then costs a call of its own, so it is only made
+    (in parallel too) when executive=True; the fetch tools leave it out.
     
     Returns:
         Dictionary containing:
@@ -69,130 +185,616 @@ def select_best_template_and_generate_summary(
         - selection_reasoning: Why this template was chosen
         - focused_summary: Final summary using the selected template
         - holistic_summary: A holistic summary covering all templates
+        - executive_summary: Brief overview (None when the separate calls ran without executive)
     """
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
+    model = model or get_model()
+    # Serialized once, shared by every prompt below
+    analyses_text = format_analyses(analyses)
     
-    # Step 1: Select the best template
-    template_selection_prompt = get_template_selection_prompt(
-        json.dumps(analyses, indent=2)
-    )
+    if COMBINED_SUMMARY if combined is None else combined:
+        combined_prompt = get_combined_summary_prompt(paper_text, analyses_text, list(templates.keys()))
+        try:
+            return _parse_combined_summary(
+                cached_generate(model, combined_prompt, paper_id, "combined_summary"), templates
+            )
+        except Exception as e:
+            logger.warning(f"Combined summary unusable, falling back to separate calls: {e}")
     
-    try:
-        selection_response = model.generate_content(template_selection_prompt)
-        selection_text = selection_response.text.strip()
-        
-        # Clean markdown code blocks
-        if selection_text.startswith("```json"):
-            selection_text = selection_text[7:]
-        if selection_text.startswith("```"):
-            selection_text = selection_text[3:]
-        if selection_text.endswith("```"):
-            selection_text = selection_text[:-3]
-        selection_text = selection_text.strip()
-        
-        selection_data = json.loads(selection_text)
-        selected_template = selection_data.get("selected_template", list(templates.keys())[0])
-        selection_reasoning = selection_data.get("reasoning", "Template selected based on content analysis")
-    except Exception as e:
-        print(f"Error in template selection: {e}")
-        selected_template = list(templates.keys())[0]
-        selection_reasoning = "Default template selected due to selection error"
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="overview-summary") as pool:
+        # The holistic and executive summaries don't depend on the selection
+        holistic_future = pool.submit(_holistic_summary, model, analyses_text, paper_id)
+        executive_future = pool.submit(executive_summary, model, analyses_text, paper_id) if executive else None
+        selected_template, selection_reasoning = _select_template(model, analyses_text, templates, paper_id)
+        comprehensive_summary = _focused_summary(model, paper_text, selected_template, analyses, paper_id)
+        all_aspects_summary = holistic_future.result()
+        brief_summary = executive_future.result() if executive_future is not None else None
     
-    # Step 2: Generate comprehensive summary based on selected template
-    primary_summary_prompt = get_focused_summary_prompt(
-        selected_template,
-        paper_text,
-        analyses.get(selected_template, "No analysis available")
-    )
-    
-    try:
-        summary_response = model.generate_content(primary_summary_prompt)
-        comprehensive_summary = summary_response.text
-    except Exception as e:
-        comprehensive_summary = f"Error generating primary summary: {str(e)}"
-    
-    # Step 3: Generate holistic summary covering all aspects
-    holistic_summary_prompt = get_holistic_summary_prompt(
-        json.dumps(analyses, indent=2)
+    return {
+        "selected_template": selected_template,
+        "selection_reasoning": selection_reasoning,
+        "focused_summary": comprehensive_summary,
+        "holistic_summary": all_aspects_summary,
+        "executive_summary": brief_summary
+    }
+
+
+async def select_best_template_and_generate_summary_async(
+    paper_text: str,
+    templates: Dict[str, str],
+    analyses: Dict[str, str],
+    paper_id: str = "",
+    model: Any = None,
+    combined: Optional[bool] = None,
+    executive: bool = False
+) -> Dict[str, str]:
+    """
+    Async counterpart of select_best_template_and_generate_summary, with the
+    same combined mode and fallback.
+    """
+    model = model or get_model()
+    # Serialized once, shared by every prompt below
+    analyses_text = format_analyses(analyses)
+
+    if COMBINED_SUMMARY if combined is None else combined:
+        combined_prompt = get_combined_summary_prompt(paper_text, analyses_text, list(templates.keys()))
+        try:
+            response_text = await cached_generate_async(model, combined_prompt, paper_id, "combined_summary")
+            return _parse_combined_summary(response_text, templates)
+        except Exception as e:
+            logger.warning(f"Combined summary unusable, falling back to separate calls: {e}")
+
+    async def select_and_focus() -> Tuple[str, str, str]:
+        try:
+            selection_text = await cached_generate_async(
+                model, get_template_selection_prompt(analyses_text), paper_id, "selection"
+            )
+            selected_template, selection_reasoning = _parse_template_selection(selection_text, templates)
+        except Exception as e:
+            logger.warning(f"Error in template selection: {e}")
+            selected_template = list(templates.keys())[0]
+            selection_reasoning = "Default template selected due to selection error"
+
+        primary_summary_prompt = get_focused_summary_prompt(
+            selected_template,
+            paper_text,
+            analyses.get(selected_template, "No analysis available")
+        )
+        try:
+            comprehensive_summary = await cached_generate_async(
+                model, primary_summary_prompt, paper_id, "focused_summary"
+            )
+        except Exception as e:
+            comprehensive_summary = f"Error generating primary summary: {str(e)}"
+        return selected_template, selection_reasoning, comprehensive_summary
+
+    async def holistic() -> str:
+        try:
+            return await cached_generate_async(
+                model, get_holistic_summary_prompt(analyses_text), paper_id, "holistic_summary"
+            )
+        except Exception as e:
+            return f"Error generating holistic summary: {str(e)}"
+
+    async def brief() -> Optional[str]:
+        return await executive_summary_async(model, analyses_text, paper_id) if executive else None
+
+    (selected_template, selection_reasoning, comprehensive_summary), all_aspects_summary, brief_summary = (
+        await asyncio.gather(select_and_focus(), holistic(), brief())
     )
-    
-    try:
-        holistic_response = model.generate_content(holistic_summary_prompt)
-        all_aspects_summary = holistic_response.text
-    except Exception as e:
-        all_aspects_summary = f"Error generating holistic summary: {str(e)}"
-    
     return {
         "selected_template": selected_template,
         "selection_reasoning": selection_reasoning,
         "focused_summary": comprehensive_summary,
-        "holistic_summary": all_aspects_summary
+        "holistic_summary": all_aspects_summary,
+        "executive_summary": brief_summary
     }
 
 
-@mcp.tool()
-def fetch_arxiv_papers(keywords: str, max_results: int = 5, author: str = '') -> List[Dict[str, Any]]:
+def _has_text(paper: Dict[str, Any]) -> bool:
+    """Whether download and extraction succeeded (as reported by the extract stage) and produced text."""
+    return paper.get("extraction_error") is None and bool(paper.get("extracted_text"))
+
+
+def _set_extracted_text(paper: Dict[str, Any], text: str, error: Optional[str]) -> None:
+    paper["extracted_text"] = text
+    paper["extraction_error"] = error
+
+
+def _record_pdf_path(paper: Dict[str, Any]) -> None:
+    index = get_paper_index()
+    local_path = paper["local_pdf_path"]
+    if index is not None and not is_error_string(local_path):
+        index.set_pdf_path(paper["arxiv_id"], local_path)
+
+
+def _download_stage(paper: Dict[str, Any]) -> Dict[str, Any]:
+    """Pipeline stage: store the PDF locally."""
+    paper["local_pdf_path"] = download_pdf(paper["pdf_url"])
+    _record_pdf_path(paper)
+    return paper
+
+
+def _extract_stage(paper: Dict[str, Any]) -> Dict[str, Any]:
+    """Pipeline stage: pull text out of the stored PDF."""
+    local_path = paper["local_pdf_path"]
+    if is_error_string(local_path):
+        _set_extracted_text(paper, "", local_path)
+    else:
+        _set_extracted_text(paper, *extract_pdf_text_checked(local_path))
+    return paper
+
+
+def _templates_stage(paper: Dict[str, Any]) -> Dict[str, Any]:
+    """Pipeline stage: dynamically generate templates based on paper content."""
+    if _has_text(paper):
+        logger.info(f"Generating dynamic templates for: {paper['title']}")
+        paper["generated_templates"] = generate_dynamic_templates(
+            paper["extracted_text"],
+            paper["arxiv_id"]
+        )
+    return paper
+
+
+def _analyze_stage(paper: Dict[str, Any]) -> Dict[str, Any]:
+    """Pipeline stage: analyze using the generated templates."""
+    if _has_text(paper):
+        logger.info(f"Analyzing paper with {len(paper['generated_templates'])} custom templates...")
+        paper["template_analyses"] = analyze_with_templates(
+            paper["extracted_text"],
+            paper["generated_templates"],
+            paper_id=paper["arxiv_id"]
+        )
+    return paper
+
+
+def _summarize_stage(paper: Dict[str, Any]) -> Dict[str, Any]:
+    """Pipeline stage: select best template and generate summaries."""
+    if _has_text(paper):
+        logger.info(f"Selecting best template and generating summaries for: {paper['title']}")
+        paper["summary_results"] = select_best_template_and_generate_summary(
+            paper["extracted_text"],
+            paper["generated_templates"],
+            paper["template_analyses"],
+            paper["arxiv_id"]
+        )
+    return paper
+
+
+def _build_paper_result(paper: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a finished pipeline item into the tool's result format."""
+    if not _has_text(paper):
+        return {
+            "arxiv_id": paper["arxiv_id"],
+            "title": paper["title"],
+            "authors": paper["authors"],
+            "pdf_url": paper["pdf_url"],
+            "local_pdf_path": paper["local_pdf_path"],
+            "error": "Failed to extract text from PDF"
+        }
+
+    summary_results = paper["summary_results"]
+    return {
+        "arxiv_id": paper["arxiv_id"],
+        "title": paper["title"],
+        "authors": paper["authors"],
+        "pdf_url": paper["pdf_url"],
+        "local_pdf_path": paper["local_pdf_path"],
+        "extracted_text_snippet": paper["extracted_text"][:500],
+
+        # Template generation results
+        "generated_templates": paper["generated_templates"],
+
+        # Individual template analyses
+        "template_analyses": paper["template_analyses"],
+
+        # Summary results
+        "best_template": summary_results["selected_template"],
+        "template_selection_reasoning": summary_results["selection_reasoning"],
+        "focused_summary": summary_results["focused_summary"],
+        "holistic_summary": summary_results["holistic_summary"],
+        "executive_summary": summary_results.get("executive_summary")
+    }
+
+
+def check_detail(detail: str) -> None:
+    if detail not in DETAIL_LEVELS:
+        raise ValueError(f"detail must be one of {', '.join(DETAIL_LEVELS)}, got '{detail}'")
+
+
+def store_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the full result of a summarized paper for the paper:// resource and local search."""
+    if "error" not in result:
+        get_result_store().put(result)
+        index_result(result)
+    return result
+
+
+def index_result(result: Dict[str, Any]) -> None:
+    """Add a stored result to the search index, with the full text from the PDF's sidecar when available."""
+    index = get_search_index()
+    if index is None:
+        return
+    text = read_cached_text(result["local_pdf_path"]) if result.get("local_pdf_path") else None
+    try:
+        index.add(result, text or result.get("extracted_text_snippet", ""))
+    except Exception as e:
+        logger.error(f"Failed to index {result['arxiv_id']} for search: {e}")
+
+
+def paper_uri(arxiv_id: str) -> str:
     """
-    Fetch papers, store PDF, extract text, dynamically generate custom templates, 
-    perform comprehensive analysis, select best template, and generate summaries using Gemini.
+    paper:// resource URI for a stored result. The ID is percent-encoded:
+    old-style IDs like hep-th/9901001v1 contain a slash, which would otherwise
+    match the paper://{arxiv_id}/{field} template.
+    """
+    return f"paper://{quote(arxiv_id, safe='')}"
+
+
+def result_view(result: Dict[str, Any], detail: str) -> Dict[str, Any]:
+    """
+    The part of a full result returned for a detail level: "ids" is just the
+    identity, "summary" drops the heavy fields (templates, per-template
+    analyses, text snippet) and "full" is everything. Non-full views of
+    summarized papers point at the resource holding the rest.
     """
+    if detail == "full":
+        return result
+    if detail == "ids":
+        view = {key: result[key] for key in ("arxiv_id", "title", "query", "error") if key in result}
+    else:
+        view = {key: value for key, value in result.items() if key not in HEAVY_FIELDS}
+    if "error" not in result:
+        view["details_uri"] = paper_uri(result["arxiv_id"])
+    return view
+
+
+def get_paper_stages() -> List[Stage]:
+    """Stages run for every matching paper, each with its own queue and workers."""
+    return [
+        Stage("download", _download_stage, DOWNLOAD_CONCURRENCY, PIPELINE_QUEUE_SIZE),
+        Stage("extract", _extract_stage, EXTRACT_CONCURRENCY, PIPELINE_QUEUE_SIZE),
+        Stage("templates", _templates_stage, LLM_CONCURRENCY, PIPELINE_QUEUE_SIZE),
+        Stage("analyze", _analyze_stage, LLM_CONCURRENCY, PIPELINE_QUEUE_SIZE),
+        Stage("summarize", _summarize_stage, LLM_CONCURRENCY, PIPELINE_QUEUE_SIZE),
+    ]
+
+
+def _paper_from_result(result: Any) -> Dict[str, Any]:
+    """Metadata the pipeline needs from an arxiv.Result, recorded in the local index."""
+    paper = {
+        "arxiv_id": result.get_short_id(),
+        "title": str(result.title),
+        "authors": ", ".join(str(author.name) for author in result.authors),
+        "categories": list(getattr(result, 'categories', None) or []),
+        "pdf_url": str(result.pdf_url)
+    }
+    index = get_paper_index()
+    if index is not None:
+        index.upsert(paper)
+    return paper
+
+
+def _iter_matching_papers(keywords: str, max_results: int, author: str) -> Iterator[Dict[str, Any]]:
+    """Search arXiv by title (and optionally author), yielding exact title matches."""
+    import arxiv
+
     client = arxiv.Client()
     query = f'ti:"{keywords}"'
     if author:
         query += f' AND au:"{author}"'
     search = arxiv.Search(query=query, max_results=max_results, sort_by=arxiv.SortCriterion.SubmittedDate)
 
-    papers: List[Dict[str, Any]] = []
     for result in client.results(search):
-        if result.title.strip().lower() == keywords.strip().lower():
-            pdf_url = str(result.pdf_url)
-            local_path = download_pdf(pdf_url)  # Download and store
-            extracted_text = extract_pdf_text(local_path) if "Error" not in local_path else ""
-            
-            if extracted_text and "Error" not in extracted_text:
-                # Step 1: Dynamically generate templates based on paper content
-                print(f"Generating dynamic templates for: {result.title}")
-                custom_templates = generate_dynamic_templates(extracted_text)
-                
-                # Step 2: Analyze using the generated templates
-                print(f"Analyzing paper with {len(custom_templates)} custom templates...")
-                analyses = analyze_with_templates(extracted_text, custom_templates)
-                
-                # Step 3: Select best template and generate summaries
-                print(f"Selecting best template and generating summaries...")
-                summary_results = select_best_template_and_generate_summary(
-                    extracted_text, 
-                    custom_templates, 
-                    analyses
-                )
-                
-                papers.append({
-                    "title": str(result.title),
-                    "authors": ", ".join(str(author.name) for author in result.authors),
-                    "pdf_url": pdf_url,
-                    "local_pdf_path": local_path,
-                    "extracted_text_snippet": extracted_text[:500],
-                    
-                    # Template generation results
-                    "generated_templates": custom_templates,
-                    
-                    # Individual template analyses
-                    "template_analyses": analyses,
-                    
-                    # Summary results
-                    "best_template": summary_results["selected_template"],
-                    "template_selection_reasoning": summary_results["selection_reasoning"],
-                    "focused_summary": summary_results["focused_summary"],
-                    "holistic_summary": summary_results["holistic_summary"]
-                })
-            else:
-                papers.append({
-                    "title": str(result.title),
-                    "authors": ", ".join(str(author.name) for author in result.authors),
-                    "pdf_url": pdf_url,
-                    "local_pdf_path": local_path,
-                    "error": "Failed to extract text from PDF"
-                })
-
-    return papers
+        paper = _paper_from_result(result)
+        if normalize_title(paper["title"]) == normalize_title(keywords):
+            yield {key: paper[key] for key in ("arxiv_id", "title", "authors", "pdf_url")}
+
+
+def _batches(items: List[str], size: int) -> Iterator[List[str]]:
+    size = max(1, size)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _lookup_ids(ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch metadata for arXiv IDs in batched id_list queries, keyed by the requested ID."""
+    import arxiv
+
+    found: Dict[str, Dict[str, Any]] = {}
+    client = arxiv.Client(page_size=max(1, ARXIV_ID_BATCH_SIZE))
+    for batch in _batches(ids, ARXIV_ID_BATCH_SIZE):
+        try:
+            with timed("arxiv_query", kind="id_list"):
+                results = [_paper_from_result(result) for result in client.results(arxiv.Search(id_list=batch))]
+        except Exception as e:
+            logger.error(f"arXiv ID lookup failed for {batch}: {e}")
+            continue
+        for paper in results:
+            base_id, version = parse_arxiv_id(paper["arxiv_id"]) or (paper["arxiv_id"], None)
+            for requested in batch:
+                requested_id, requested_version = parse_arxiv_id(requested)
+                if requested_id == base_id and requested_version in (None, version):
+                    found[requested] = paper
+    return found
+
+
+def _lookup_titles(titles: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Resolve exact titles with one OR-ed ti: query per batch, keyed by the requested title."""
+    import arxiv
+
+    found: Dict[str, Dict[str, Any]] = {}
+    client = arxiv.Client()
+    for batch in _batches(titles, ARXIV_TITLE_BATCH_SIZE):
+        wanted = {normalize_title(title): title for title in batch}
+        query = " OR ".join(f'ti:"{title.replace(chr(34), "")}"' for title in batch)
+        search = arxiv.Search(query=query, max_results=len(batch) * 5)
+        try:
+            with timed("arxiv_query", kind="title"):
+                results = [_paper_from_result(result) for result in client.results(search)]
+        except Exception as e:
+            logger.error(f"arXiv title lookup failed for {batch}: {e}")
+            continue
+        for paper in results:
+            requested = wanted.get(normalize_title(paper["title"]))
+            if requested is not None and requested not in found:
+                found[requested] = paper
+    return found
+
+
+def resolve_arxiv_papers(identifiers: List[str]) -> List[Dict[str, Any]]:
+    """
+    Resolve arXiv IDs (2501.01234, 2501.01234v2, arXiv:..., abs/pdf URLs) or
+    exact titles to paper metadata, one entry per identifier. The local index
+    answers first; whatever it can't is fetched from arXiv in batches.
+    Unresolved identifiers get an entry with an "error" key.
+    """
+    index = get_paper_index()
+    resolved: Dict[str, Dict[str, Any]] = {}
+    missing_ids: List[str] = []
+    missing_titles: List[str] = []
+
+    for identifier in dict.fromkeys(item.strip() for item in identifiers if item.strip()):
+        if parse_arxiv_id(identifier):
+            paper = index.get(identifier) if index is not None else None
+            if paper is None:
+                missing_ids.append(identifier)
+        else:
+            matches = index.find_by_title(identifier, limit=1) if index is not None else []
+            paper = matches[0] if matches else None
+            if paper is None:
+                missing_titles.append(identifier)
+        if paper is not None:
+            resolved[identifier] = paper
+
+    if missing_ids:
+        resolved.update(_lookup_ids(missing_ids))
+    if missing_titles:
+        resolved.update(_lookup_titles(missing_titles))
+    logger.info(
+        f"Resolved {len(resolved)} identifiers "
+        f"({len(missing_ids)} IDs and {len(missing_titles)} titles looked up on arXiv)"
+    )
+
+    results = []
+    for identifier in identifiers:
+        paper = resolved.get(identifier.strip())
+        if paper is None:
+            results.append({"query": identifier, "error": "Not found on arXiv"})
+        else:
+            results.append(dict(paper, query=identifier))
+    return results
+
+
+@mcp.tool()
+async def fetch_arxiv_papers(
+    keywords: str,
+    max_results: int = 5,
+    author: str = '',
+    detail: str = 'summary',
+    ctx: Optional[Context] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fetch papers, store PDF, extract text, dynamically generate custom templates, 
+    perform comprehensive analysis, select best template, and generate summaries using Gemini.
+    Matching papers flow through a staged pipeline so downloads, extraction and
+    LLM calls for different papers overlap. The pipeline runs on worker threads,
+    off the event loop, and each paper is pushed to the client as soon as it is
+    summarized (progress plus a "papers" log notification, as in
+    fetch_arxiv_papers_async); the full list is still returned at the end.
+    detail: "ids" (arXiv ID and title), "summary" (default: metadata and all
+    summaries) or "full" (also generated templates, per-template analyses and
+    a text snippet). The full result of every paper can be read later from the
+    paper://{arxiv_id} resource.
+    """
+    check_detail(detail)
+    loop = asyncio.get_running_loop()
+    views: Dict[int, Dict[str, Any]] = {}
+
+    def deliver(index: int, paper: Dict[str, Any]) -> None:
+        views[index] = result_view(store_result(_build_paper_result(paper)), detail)
+        # Sent from the pipeline thread; the total isn't known while the search is still paging
+        asyncio.run_coroutine_threadsafe(_notify_paper_done(ctx, views[index], len(views), None), loop).result()
+
+    await asyncio.to_thread(
+        run_pipeline, _iter_matching_papers(keywords, max_results, author), get_paper_stages(), deliver
+    )
+    return [views[index] for index in sorted(views)]
+
+
+@mcp.tool()
+def fetch_arxiv_papers_by_id(
+    identifiers: List[str],
+    summarize: bool = True,
+    detail: str = 'summary'
+) -> List[Dict[str, Any]]:
+    """
+    Fetch known papers directly from a list of arXiv IDs (optionally versioned)
+    or exact titles. IDs are resolved in batched id_list queries and titles in
+    batched title queries, with repeat lookups served from the local metadata
+    index. With summarize=False only the metadata is returned; otherwise each
+    paper runs through the same pipeline as fetch_arxiv_papers, and detail
+    selects the payload as there.
+    Results are in input order; unresolved identifiers carry an "error" key.
+    """
+    check_detail(detail)
+    resolved = resolve_arxiv_papers(identifiers)
+    if not summarize:
+        return resolved
+
+    papers: Dict[str, Dict[str, Any]] = {}
+    for entry in resolved:
+        if "error" not in entry and entry["arxiv_id"] not in papers:
+            papers[entry["arxiv_id"]] = {key: entry[key] for key in ("arxiv_id", "title", "authors", "pdf_url")}
+    processed = run_pipeline(list(papers.values()), get_paper_stages())
+    results = {paper["arxiv_id"]: store_result(_build_paper_result(paper)) for paper in processed}
+    return [
+        entry if "error" in entry else result_view(dict(results[entry["arxiv_id"]], query=entry["query"]), detail)
+        for entry in resolved
+    ]
+
+
+@mcp.resource("paper://{arxiv_id}", mime_type="application/json")
+def get_paper_details(arxiv_id: str) -> str:
+    """
+    Full stored result for a summarized paper: summaries plus the generated
+    templates, per-template analyses and text snippet left out of compact results.
+    Old-style IDs are percent-encoded in the URI (see paper_uri).
+    """
+    arxiv_id = unquote(arxiv_id)
+    result = get_result_store().get(arxiv_id)
+    if result is None:
+        raise ValueError(f"No summarized result stored for '{arxiv_id}'")
+    return json.dumps(result)
+
+
+@mcp.resource("paper://{arxiv_id}/{field}", mime_type="application/json")
+def get_paper_field(arxiv_id: str, field: str) -> str:
+    """
+    One field of a stored paper result, e.g. paper://2501.01234v1/template_analyses
+    or paper://hep-th%2F9901001v1/focused_summary.
+    """
+    arxiv_id = unquote(arxiv_id)
+    result = get_result_store().get(arxiv_id)
+    if result is None:
+        raise ValueError(f"No summarized result stored for '{arxiv_id}'")
+    if field not in result:
+        raise ValueError(f"Unknown field '{field}'; available: {', '.join(result)}")
+    return json.dumps(result[field])
+
+
+async def download_pdf_async(pdf_url: str, download_dir: str = "./pdfs") -> str:
+    """Async counterpart of download_pdf."""
+    with timed("download_pdf"):
+        try:
+            return await get_download_manager(download_dir).fetch_async(pdf_url)
+        except Exception as e:
+            metrics.inc("errors_total", operation="download_pdf")
+            return f"Error downloading PDF: {str(e)}"
+
+
+async def extract_pdf_text_checked_async(
+    local_path: str,
+    max_pages: int = MAX_PAGES,
+    max_chars: int = MAX_CHARS
+) -> Tuple[str, Optional[str]]:
+    """
+    Run extract_pdf_text_checked off the event loop (parsing itself happens on the process pool).
+    Calls for the same PDF queue on the loop, so at most one thread waits on its cache lock.
+    """
+    lock = AsyncKeyLock(text_lock_key(local_path))
+    await lock.acquire()
+    try:
+        return await asyncio.to_thread(extract_pdf_text_checked, local_path, max_pages, max_chars)
+    finally:
+        lock.release()
+
+
+async def process_paper_async(paper: Dict[str, Any], model: Any = None) -> Dict[str, Any]:
+    """Download, extract, template, analyze and summarize one paper without blocking the loop."""
+    model = model or get_model()
+    paper["local_pdf_path"] = await download_pdf_async(paper["pdf_url"])
+    await asyncio.to_thread(_record_pdf_path, paper)
+    local_path = paper["local_pdf_path"]
+    if is_error_string(local_path):
+        _set_extracted_text(paper, "", local_path)
+    else:
+        _set_extracted_text(paper, *await extract_pdf_text_checked_async(local_path))
+
+    if _has_text(paper):
+        paper["generated_templates"] = await generate_dynamic_templates_async(
+            paper["extracted_text"],
+            paper["arxiv_id"],
+            model
+        )
+        paper["template_analyses"] = await analyze_with_templates_async(
+            paper["extracted_text"],
+            paper["generated_templates"],
+            model=model,
+            paper_id=paper["arxiv_id"]
+        )
+        paper["summary_results"] = await select_best_template_and_generate_summary_async(
+            paper["extracted_text"],
+            paper["generated_templates"],
+            paper["template_analyses"],
+            paper["arxiv_id"],
+            model
+        )
+    return _build_paper_result(paper)
+
+
+async def _notify_paper_done(ctx: Optional[Context], paper: Dict[str, Any], done: int, total: Optional[int]) -> None:
+    """
+    Push one finished paper to the client: a progress notification plus a log
+    notification on the "papers" logger carrying the paper itself.
+    """
+    if ctx is None:
+        return
+    try:
+        await ctx.report_progress(done, total, f"Summarized {paper['title']}")
+        await ctx.session.send_log_message(
+            level="info",
+            data={"event": "paper_completed", "index": done, "total": total, "paper": paper},
+            logger="papers",
+            related_request_id=ctx.request_id
+        )
+    except Exception as e:
+        # Not inside an MCP request (e.g. called directly), or the client went away
+        logger.debug(f"Could not send progress notification: {e}")
+
+
+@mcp.tool()
+async def fetch_arxiv_papers_async(
+    keywords: str,
+    max_results: int = 5,
+    author: str = '',
+    detail: str = 'summary',
+    ctx: Optional[Context] = None
+) -> List[Dict[str, Any]]:
+    """
+    Non-blocking variant of fetch_arxiv_papers: same results and detail levels,
+    but downloads and Gemini calls are async, so one server can serve many
+    requests concurrently. Each paper is also pushed to the client as soon as it
+    is summarized, via a progress notification and a "papers" log notification
+    containing the result at the requested detail level.
+    """
+    check_detail(detail)
+    matches = await asyncio.to_thread(lambda: list(_iter_matching_papers(keywords, max_results, author)))
+    logger.info(f"Found {len(matches)} matching papers for: {keywords}")
+    semaphore = asyncio.Semaphore(max(1, LLM_CONCURRENCY))
+    model = get_model()
+
+    async def bounded(index: int, paper: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        async with semaphore:
+            return index, await process_paper_async(paper, model)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(matches)
+    done = 0
+    for finished in asyncio.as_completed([bounded(i, paper) for i, paper in enumerate(matches)]):
+        index, result = await finished
+        await asyncio.to_thread(store_result, result)
+        paper = result_view(result, detail)
+        results[index] = paper
+        done += 1
+        await _notify_paper_done(ctx, paper, done, len(matches))
 
+    return [paper for paper in results if paper is not None]
@@ -0,0 +1,264 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+import logging
+import os
+import socket
+import threading
+import uuid
+from src.server.mcp_server import mcp
+from src.utils.job_store import ClaimedPaper, JobStore, LeaseLost, STAGES, get_job_store
+from src.utils.metrics import is_error_string
+from src.tools.arxiv_fetcher import (
+    _build_paper_result,
+    _download_stage,
+    _extract_stage,
+    _templates_stage,
+    _analyze_stage,
+    _summarize_stage,
+    _iter_matching_papers,
+    check_detail,
+    resolve_arxiv_papers,
+    result_view,
+    store_result
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Worker threads started in the server process; 0 leaves jobs to worker.py processes
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))
+# "index/count": this process's share of papers, by arXiv ID (see JobStore.claim)
+JOB_SHARD = os.getenv('JOB_SHARD', '')
+
+# Checkpointed stage reached after each pipeline step
+JOB_STAGES = [
+    ("downloaded", _download_stage),
+    ("extracted", _extract_stage),
+    ("templated", _templates_stage),
+    ("analyzed", _analyze_stage),
+]
+
+# Large or derivable fields left out of checkpoints; extracted text comes back from the sidecar cache
+_UNCHECKPOINTED = ("extracted_text",)
+
+
+def _checkpoint_state(paper: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in paper.items() if key not in _UNCHECKPOINTED}
+
+
+class StageError(Exception):
+    """A stage returned an error result instead of raising; the paper is retried from its last checkpoint."""
+
+
+def _stage_error(stage: str, paper: Dict[str, Any]) -> Optional[str]:
+    """The error a stage left in the paper, if any (stages report failures as "Error ..." strings)."""
+    if stage == "downloaded" and is_error_string(paper["local_pdf_path"]):
+        return paper["local_pdf_path"]
+    if stage == "extracted":
+        return paper.get("extraction_error")
+    if stage == "analyzed":
+        return next((a for a in paper.get("template_analyses", {}).values() if is_error_string(a)), None)
+    if stage == "summarized":
+        return next((s for s in paper.get("summary_results", {}).values() if is_error_string(s)), None)
+    return None
+
+
+@contextmanager
+def _keep_lease(store: JobStore, claim: ClaimedPaper) -> Iterator[threading.Event]:
+    """
+    Renew the claim's lease in the background while its stages run, since a
+    single stage (queued PDF extraction, model calls backing off) can outlast
+    the lease. The yielded event is set once the lease turns out to be lost.
+    """
+    lost = threading.Event()
+    done = threading.Event()
+
+    def renew() -> None:
+        while not done.wait(store.lease_seconds / 3):
+            try:
+                store.renew(claim)
+            except LeaseLost:
+                lost.set()
+                return
+            except Exception as e:
+                logger.warning(f"Could not renew lease on job {claim.job_id} paper {claim.position}: {e}")
+
+    thread = threading.Thread(target=renew, name="job-lease", daemon=True)
+    thread.start()
+    try:
+        yield lost
+    finally:
+        done.set()
+        thread.join()
+
+
+def _run_stage(stage: str, func: Any, paper: Dict[str, Any], lost: threading.Event) -> Dict[str, Any]:
+    paper = func(paper)
+    if lost.is_set():
+        raise LeaseLost(f"Lease lost during stage '{stage}'")
+    error = _stage_error(stage, paper)
+    if error is not None:
+        raise StageError(error)
+    return paper
+
+
+def process_claimed_paper(store: JobStore, claim: ClaimedPaper) -> None:
+    """
+    Run a claimed paper from its last checkpoint to a summarized result.
+    A stage that returns an error (failed download or extraction, an error
+    analysis or summary) raises StageError before it is checkpointed, so the
+    paper is retried from its last good checkpoint. If another worker took
+    the paper over after the lease lapsed, LeaseLost stops the run without
+    writing anything.
+    """
+    paper = claim.state
+    done = STAGES.index(claim.stage)
+    with _keep_lease(store, claim) as lost:
+        if done >= STAGES.index("extracted"):
+            paper = _run_stage("extracted", _extract_stage, paper, lost)
+        for stage, func in JOB_STAGES[done:]:
+            paper = _run_stage(stage, func, paper, lost)
+            store.checkpoint(claim, stage, _checkpoint_state(paper))
+        paper = _run_stage("summarized", _summarize_stage, paper, lost)
+        store.complete(claim, store_result(_build_paper_result(paper)))
+
+
+def parse_shard(value: str) -> Optional[Tuple[int, int]]:
+    """Parse "index/count" (e.g. "0/4"); empty means unsharded."""
+    if not value:
+        return None
+    index, _, count = value.partition('/')
+    shard = (int(index), int(count))
+    if not 0 <= shard[0] < shard[1]:
+        raise ValueError(f"Invalid shard '{value}': expected index/count with 0 <= index < count")
+    return shard
+
+
+_shard: Optional[Tuple[int, int]] = parse_shard(JOB_SHARD)
+
+
+def set_shard(index: int, count: int) -> None:
+    """Shard for this process's worker threads; call before they start."""
+    global _shard
+    _shard = (index, count) if count > 1 else None
+
+
+def run_worker(
+    store: JobStore,
+    worker_id: str,
+    stop: threading.Event,
+    exit_when_idle: bool = False,
+    shard: Optional[Tuple[int, int]] = None
+) -> None:
+    """Claim and process papers until stopped (or, with exit_when_idle, until none are left)."""
+    while not stop.is_set():
+        claim = store.claim(worker_id, shard)
+        if claim is None:
+            if exit_when_idle and not store.has_open_work():
+                return
+            stop.wait(JOB_POLL_INTERVAL)
+            continue
+        logger.info(f"{worker_id}: job {claim.job_id} paper {claim.position} resuming after '{claim.stage}'")
+        try:
+            process_claimed_paper(store, claim)
+        except LeaseLost as e:
+            logger.warning(f"{worker_id}: job {claim.job_id} paper {claim.position} abandoned: {e}")
+        except Exception as e:
+            logger.error(f"{worker_id}: job {claim.job_id} paper {claim.position} failed at '{claim.stage}': {e}")
+            try:
+                store.release(claim, f"Error after stage '{claim.stage}': {e}")
+            except LeaseLost:
+                logger.warning(f"{worker_id}: job {claim.job_id} paper {claim.position} was taken over meanwhile")
+
+
+def new_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+_workers: List[threading.Thread] = []
+_workers_lock = threading.Lock()
+_stop = threading.Event()
+
+
+def ensure_workers() -> None:
+    """Start this process's job worker threads once; they also resume unfinished jobs from earlier runs."""
+    with _workers_lock:
+        if _workers or JOB_WORKERS <= 0:
+            return
+        store = get_job_store()
+        for _ in range(JOB_WORKERS):
+            thread = threading.Thread(
+                target=run_worker, args=(store, new_worker_id(), _stop, False, _shard), name="job-worker", daemon=True
+            )
+            thread.start()
+            _workers.append(thread)
+
+
+def resume_pending_jobs() -> None:
+    """Start workers at server startup if an earlier run left papers unfinished."""
+    if JOB_WORKERS > 0 and get_job_store().has_open_work():
+        logger.info("Resuming unfinished summarization jobs")
+        ensure_workers()
+
+
+@mcp.tool()
+def submit_summarization_job(
+    keywords: str = '',
+    max_results: int = 5,
+    author: str = '',
+    identifiers: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Queue a batch summarization and return its job_id immediately.
+    Papers come from a title search (keywords/author, as in fetch_arxiv_papers)
+    or from a list of arXiv IDs or titles (as in fetch_arxiv_papers_by_id).
+    Every paper's progress is checkpointed after each stage, so the batch
+    survives client disconnects and server restarts and can be worked on by
+    several processes (see worker.py). Poll get_job_status / get_job_results.
+    """
+    if identifiers:
+        resolved = resolve_arxiv_papers(identifiers)
+        papers = [entry for entry in resolved if "error" not in entry]
+        unresolved = [entry["query"] for entry in resolved if "error" in entry]
+    elif keywords:
+        papers = list(_iter_matching_papers(keywords, max_results, author))
+        unresolved = []
+    else:
+        return {"error": "Provide keywords or identifiers"}
+
+    papers = [{key: paper[key] for key in ("arxiv_id", "title", "authors", "pdf_url")} for paper in papers]
+    params = {"keywords": keywords, "max_results": max_results, "author": author, "identifiers": identifiers}
+    job_id = get_job_store().create_job(papers, params)
+    ensure_workers()
+    logger.info(f"Queued job {job_id} with {len(papers)} papers")
+    return {"job_id": job_id, "total": len(papers), "status": "queued", "unresolved": unresolved}
+
+
+@mcp.tool()
+def get_job_status(job_id: str) -> Dict[str, Any]:
+    """Overall status, per-stage counts and per-paper stage of a summarization job."""
+    ensure_workers()
+    job = get_job_store().get_job(job_id)
+    return job if job is not None else {"error": f"Unknown job '{job_id}'"}
+
+
+@mcp.tool()
+def get_job_results(job_id: str, detail: str = 'summary') -> Dict[str, Any]:
+    """
+    Results for every finished paper of a job, in submission order; call again
+    while the status is queued or running to pick up newly finished papers.
+    detail is "ids", "summary" (default) or "full", as in fetch_arxiv_papers.
+    """
+    check_detail(detail)
+    store = get_job_store()
+    job = store.get_job(job_id)
+    if job is None:
+        return {"error": f"Unknown job '{job_id}'"}
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "finished": job["finished"],
+        "total": job["total"],
+        "results": [result_view(result, detail) for result in store.get_results(job_id)]
+    }
@@ -0,0 +1,63 @@
+from typing import Any, Dict
+import logging
+import threading
+import time
+from src.server.mcp_server import mcp
+from src.utils.result_store import get_result_store
+from src.utils.search_index import get_search_index
+from src.tools.arxiv_fetcher import check_detail, index_result, result_view
+
+
+logger = logging.getLogger(__name__)
+
+_synced = False
+_sync_lock = threading.Lock()
+
+
+def sync_search_index() -> int:
+    """Index stored results the search index hasn't seen (e.g. summarized before it existed); returns how many."""
+    global _synced
+    index = get_search_index()
+    if index is None:
+        return 0
+    with _sync_lock:
+        if _synced:
+            return 0
+        store = get_result_store()
+        missing = set(store.ids()) - set(index.indexed_ids())
+        for arxiv_id in sorted(missing):
+            result = store.get(arxiv_id)
+            if result is not None:
+                index_result(result)
+        if missing:
+            logger.info(f"Indexed {len(missing)} stored results for search")
+        _synced = True
+        return len(missing)
+
+
+@mcp.tool()
+def search_processed_papers(query: str, limit: int = 5, detail: str = 'summary') -> Dict[str, Any]:
+    """
+    Search papers this server has already summarized, locally: no arXiv or
+    model calls. Ranks by BM25 over titles, summaries and extracted text
+    (blended with hashed-vector similarity when NumPy is installed) and returns
+    the stored results at the requested detail ("ids", "summary" or "full"),
+    each with its score.
+    """
+    check_detail(detail)
+    index = get_search_index()
+    if index is None:
+        return {"error": "Search index is disabled (SEARCH_INDEX_ENABLED=0)"}
+    start = time.perf_counter()
+    sync_search_index()
+    store = get_result_store()
+    results = []
+    for hit in index.search(query, max(1, limit)):
+        stored = store.get(hit["arxiv_id"])
+        if stored is not None:
+            results.append(dict(result_view(stored, detail), **hit))
+    return {
+        "query": query,
+        "results": results,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+    }
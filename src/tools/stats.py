@@ -0,0 +1,48 @@
+from typing import Any, Dict, Union
+from src.server.mcp_server import mcp
+from src.utils.metrics import metrics
+from src.utils.llm_cache import get_llm_cache
+from src.utils.downloads import get_download_manager
+from src.utils.pdf_text import get_extraction_pool
+from src.utils.scheduler import get_scheduler
+from src.utils.paper_index import get_paper_index
+from src.utils.template_store import get_template_store
+from src.utils.result_store import get_result_store
+from src.utils.search_index import get_search_index
+
+
+def get_stats_snapshot() -> Dict[str, Any]:
+    """Metrics registry snapshot plus cache, download, paper index, template and result stores, search index, extraction pool and scheduler state."""
+    snapshot = metrics.snapshot()
+    cache = get_llm_cache()
+    pool = get_extraction_pool()
+    snapshot["llm_cache"] = cache.stats() if cache is not None else None
+    snapshot["downloads"] = get_download_manager().stats()
+    index = get_paper_index()
+    snapshot["paper_index"] = index.stats() if index is not None else None
+    store = get_template_store()
+    snapshot["template_store"] = store.stats() if store is not None else None
+    snapshot["result_store"] = get_result_store().stats()
+    search = get_search_index()
+    snapshot["search_index"] = search.stats() if search is not None else None
+    snapshot["extraction_pool"] = {"workers": pool.workers, "timeouts": pool.timeouts} if pool is not None else None
+    snapshot["scheduler"] = get_scheduler().stats()
+    return snapshot
+
+
+@mcp.tool()
+def get_performance_stats(format: str = "json") -> Union[Dict[str, Any], str]:
+    """
+    Live performance snapshot: per-operation latency histograms, LLM calls per
+    stage with prompt/response sizes, token counts, cache hits and error counts.
+    Pass format="prometheus" for Prometheus text exposition instead of JSON.
+    """
+    if format == "prometheus":
+        text = metrics.to_prometheus()
+        cache = get_llm_cache()
+        if cache is not None:
+            cache_stats = cache.stats()
+            for key in ("hits", "misses", "evictions", "expirations", "entries", "bytes"):
+                text += f"paper_summarizer_llm_cache_{key} {cache_stats[key]}\n"
+        return text
+    return get_stats_snapshot()
@@ -1,7 +1,8 @@
-from typing import Dict, List
-import google.generativeai as genai
+from typing import Dict, List, Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
 import os
-from dotenv import load_dotenv
 import json
 from src.server.mcp_server import mcp
 from src.prompts.templates import (
@@ -10,78 +11,224 @@ from src.prompts.templates import (
 )
 from typing import Any
 from src.prompts.fallback import get_fallback_templates
+from src.prompts.rendering import format_analyses, render_template_prompt
+from src.utils.helpers import strip_code_fences
+from src.utils.model_backend import get_model
+from src.utils.metrics import instrumented, metrics, timed
+from src.utils.llm_cache import cached_generate, cached_generate_async
+from src.utils.chunking import TEMPLATE_CONTEXT_TOKENS, overview_context, template_context
+from src.utils.paper_index import get_paper_index
+from src.utils.template_store import TemplateStore, get_template_store, paper_signature
 
-# Load environment variables
-load_dotenv()
 
-# Configure Gemini API
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables. Please set it in your .env file.")
+# Progress and errors go to stderr via logging; stdout carries the stdio transport
+logger = logging.getLogger(__name__)
 
-genai.configure(api_key=GEMINI_API_KEY)
+# Upper bound on simultaneous per-template model calls for a single paper
+MAX_ANALYSIS_CONCURRENCY = int(os.getenv('MAX_ANALYSIS_CONCURRENCY', '5'))
 
 
-def generate_dynamic_templates(paper_text: str) -> Dict[str, str]:
+def _parse_templates_response(response_text: str) -> Dict[str, str]:
+    """Turn the template-generation JSON response into template_name -> template_prompt."""
+    templates_data = json.loads(strip_code_fences(response_text))
+    
+    # Convert to dictionary format
+    templates_dict = {}
+    for template in templates_data.get("templates", []):
+        templates_dict[template["name"]] = template["prompt"]
+    
+    return templates_dict
+
+
+def _paper_categories(paper_id: str) -> List[str]:
+    """arXiv categories from the local paper index, when the paper is known."""
+    index = get_paper_index()
+    paper = index.get(paper_id) if index is not None and paper_id else None
+    return paper["categories"] if paper else []
+
+
+def _find_similar_templates(
+    store: TemplateStore,
+    signature: List[int],
+    categories: Sequence[str]
+) -> Optional[Dict[str, str]]:
+    """Templates stored for a similar enough paper, or None."""
+    match = store.find(signature, categories)
+    if match is None:
+        metrics.inc("template_reuse_total", outcome="miss")
+        return None
+    templates, source_paper_id, similarity = match
+    logger.info(f"Reusing templates generated for {source_paper_id or 'an earlier paper'} (similarity {similarity:.2f})")
+    metrics.inc("template_reuse_total", outcome="hit")
+    return templates
+
+
+@instrumented("generate_dynamic_templates")
+def generate_dynamic_templates(paper_text: str, paper_id: str = "", model: Any = None) -> Dict[str, str]:
     """
     Use Gemini to dynamically generate analysis templates based on the paper content.
+    paper_id (arXiv ID with version) scopes the LLM cache entry when known.
+    Templates already generated for a similar paper are reused from the
+    template store without a model call.
     Returns a dictionary of template_name -> template_prompt
     """
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
+    model = model or get_model()
+    response_text = ""
+    store = get_template_store()
+    if store is not None:
+        signature = paper_signature(paper_text)
+        categories = _paper_categories(paper_id)
+        reused = _find_similar_templates(store, signature, categories)
+        if reused:
+            return reused
     
     try:
         # Generate templates using Gemini
-        prompt = get_template_generation_prompt(paper_text[:6000])
-        response = model.generate_content(prompt)
-        
-        # Parse the JSON response
-        response_text = response.text.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
-        
-        templates_data = json.loads(response_text)
+        prompt = get_template_generation_prompt(overview_context(paper_text, TEMPLATE_CONTEXT_TOKENS))
+        response_text = cached_generate(model, prompt, paper_id, "templates")
+        templates = _parse_templates_response(response_text)
+        if store is not None and templates:
+            store.add(templates, signature, categories, paper_id)
+        return templates
         
-        # Convert to dictionary format
-        templates_dict = {}
-        for template in templates_data.get("templates", []):
-            templates_dict[template["name"]] = template["prompt"]
-        
-        return templates_dict
+    except json.JSONDecodeError as e:
+        logger.warning(f"JSON parsing error: {e}")
+        logger.debug(f"Response text: {response_text[:500]}")
+        metrics.inc("template_fallbacks_total", reason="invalid_json")
+        return get_fallback_templates()
+    except Exception as e:
+        logger.warning(f"Error generating dynamic templates: {e}")
+        metrics.inc("template_fallbacks_total", reason="error")
+        return get_fallback_templates()
+
+
+async def generate_dynamic_templates_async(
+    paper_text: str,
+    paper_id: str = "",
+    model: Any = None
+) -> Dict[str, str]:
+    """Async counterpart of generate_dynamic_templates using the async Gemini API."""
+    model = model or get_model()
+    response_text = ""
+    store = get_template_store()
+    if store is not None:
+        signature = await asyncio.to_thread(paper_signature, paper_text)
+        categories = await asyncio.to_thread(_paper_categories, paper_id)
+        reused = await asyncio.to_thread(_find_similar_templates, store, signature, categories)
+        if reused:
+            return reused
+    
+    try:
+        prompt = get_template_generation_prompt(overview_context(paper_text, TEMPLATE_CONTEXT_TOKENS))
+        response_text = await cached_generate_async(model, prompt, paper_id, "templates")
+        templates = _parse_templates_response(response_text)
+        if store is not None and templates:
+            await asyncio.to_thread(store.add, templates, signature, categories, paper_id)
+        return templates
         
     except json.JSONDecodeError as e:
-        print(f"JSON parsing error: {e}")
-        print(f"Response text: {response_text[:500]}")
+        logger.warning(f"JSON parsing error: {e}")
+        logger.debug(f"Response text: {response_text[:500]}")
+        metrics.inc("template_fallbacks_total", reason="invalid_json")
         return get_fallback_templates()
     except Exception as e:
-        print(f"Error generating dynamic templates: {e}")
+        logger.warning(f"Error generating dynamic templates: {e}")
+        metrics.inc("template_fallbacks_total", reason="error")
         return get_fallback_templates()
 
 
-def analyze_with_templates(paper_text: str, templates: Dict[str, str]) -> Dict[str, str]:
+def _analyze_single_template(
+    model: Any,
+    paper_text: str,
+    template_name: str,
+    template_prompt: str,
+    paper_id: str = ""
+) -> str:
+    """
+    Run one template against the paper, capturing failures as result text.
+    The template only sees the paper sections it needs, within the analysis budget.
+    """
+    try:
+        # Fill in the template with the relevant sections of the paper
+        prompt = render_template_prompt(template_prompt, template_context(paper_text, template_name, template_prompt))
+        with timed("analyze_template"):
+            return cached_generate(model, prompt, paper_id, "analysis")
+    except Exception as e:
+        return f"Error analyzing with template '{template_name}': {str(e)}"
+
+
+@instrumented("analyze_with_templates")
+def analyze_with_templates(
+    paper_text: str,
+    templates: Dict[str, str],
+    max_concurrency: Optional[int] = None,
+    model: Any = None,
+    paper_id: str = ""
+) -> Dict[str, str]:
     """
     Analyze the paper using all generated templates.
+    Templates are run concurrently on a bounded thread pool (max_concurrency,
+    defaulting to MAX_ANALYSIS_CONCURRENCY); pass max_concurrency=1 for the
+    sequential behaviour. Any object with a generate_content(prompt) method
+    can be passed as model.
     Returns a dictionary of template_name -> analysis_result
     """
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
-    analyses = {}
-    
-    for template_name, template_prompt in templates.items():
+    model = model or get_model()
+    if not templates:
+        return {}
+
+    workers = max(1, min(max_concurrency or MAX_ANALYSIS_CONCURRENCY, len(templates)))
+    if workers == 1:
+        return {
+            name: _analyze_single_template(model, paper_text, name, prompt, paper_id)
+            for name, prompt in templates.items()
+        }
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="template-analysis") as pool:
+        futures = {
+            name: pool.submit(_analyze_single_template, model, paper_text, name, prompt, paper_id)
+            for name, prompt in templates.items()
+        }
+    # Preserve template order in the result
+    return {name: future.result() for name, future in futures.items()}
+
+
+async def _analyze_single_template_async(
+    model: Any,
+    paper_text: str,
+    template_name: str,
+    template_prompt: str,
+    paper_id: str,
+    semaphore: asyncio.Semaphore
+) -> str:
+    async with semaphore:
         try:
-            # Fill in the template with paper text
-            prompt = template_prompt.format(text=paper_text)
-            response = model.generate_content(prompt)
-            analyses[template_name] = response.text
+            prompt = render_template_prompt(template_prompt, template_context(paper_text, template_name, template_prompt))
+            with timed("analyze_template"):
+                return await cached_generate_async(model, prompt, paper_id, "analysis")
         except Exception as e:
-            analyses[template_name] = f"Error analyzing with template '{template_name}': {str(e)}"
-    
-    return analyses
+            return f"Error analyzing with template '{template_name}': {str(e)}"
+
+
+async def analyze_with_templates_async(
+    paper_text: str,
+    templates: Dict[str, str],
+    max_concurrency: Optional[int] = None,
+    model: Any = None,
+    paper_id: str = ""
+) -> Dict[str, str]:
+    """
+    Async counterpart of analyze_with_templates.
+    Templates run as concurrent generate_content_async calls, at most
+    max_concurrency at a time.
+    """
+    model = model or get_model()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or MAX_ANALYSIS_CONCURRENCY))
+    results = await asyncio.gather(*[
+        _analyze_single_template_async(model, paper_text, name, prompt, paper_id, semaphore)
+        for name, prompt in templates.items()
+    ])
+    return dict(zip(templates.keys(), results))
 
 
 @mcp.tool()
@@ -93,34 +240,74 @@ def select_prompt_template(context: str) -> str:
     return "Dynamic template generation is now used. Templates are generated based on paper content."
 
 
-def generate_comprehensive_analysis(paper_text: str) -> Dict[str, Any]:
+def executive_summary(model: Any, analyses_text: str, paper_id: str = "") -> str:
+    """Brief overview of the analyses (the standalone call used outside combined mode)."""
+    try:
+        return cached_generate(model, get_executive_summary_prompt(analyses_text), paper_id, "executive_summary")
+    except Exception as e:
+        return f"Error generating summary: {str(e)}"
+
+
+async def executive_summary_async(model: Any, analyses_text: str, paper_id: str = "") -> str:
+    """Async counterpart of executive_summary."""
+    try:
+        return await cached_generate_async(
+            model, get_executive_summary_prompt(analyses_text), paper_id, "executive_summary"
+        )
+    except Exception as e:
+        return f"Error generating summary: {str(e)}"
+
+
+def generate_comprehensive_analysis(paper_text: str, paper_id: str = "") -> Dict[str, Any]:
     """
     Main function that generates templates and performs comprehensive analysis.
+    In combined mode (COMBINED_SUMMARY) the overview comes from the single
+    combined summary call, which also yields the selection and the other
+    summaries; otherwise from one executive summary call.
     
     Returns:
         Dictionary containing:
         - generated_templates: The templates created for this paper
         - analyses: Analysis results for each template
         - summary: A brief overview of findings
+        - summary_results: Selection and summaries (combined mode only)
     """
+    from src.tools.arxiv_fetcher import COMBINED_SUMMARY, select_best_template_and_generate_summary
+
+    model = get_model()
     # Generate custom templates based on paper content
-    templates = generate_dynamic_templates(paper_text)
+    templates = generate_dynamic_templates(paper_text, paper_id, model)
     
     # Perform analysis using all templates
-    analyses = analyze_with_templates(paper_text, templates)
-    
-    # Generate a brief summary
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
-    summary_prompt = get_executive_summary_prompt(json.dumps(analyses, indent=2))
+    analyses = analyze_with_templates(paper_text, templates, model=model, paper_id=paper_id)
     
-    try:
-        summary_response = model.generate_content(summary_prompt)
-        summary = summary_response.text
-    except Exception as e:
-        summary = f"Error generating summary: {str(e)}"
-    
-    return {
-        "generated_templates": templates,
-        "analyses": analyses,
-        "summary": summary
-    }
+    result = {"generated_templates": templates, "analyses": analyses}
+    if COMBINED_SUMMARY:
+        summary_results = select_best_template_and_generate_summary(
+            paper_text, templates, analyses, paper_id, model, executive=True
+        )
+        result["summary"] = summary_results["executive_summary"]
+        result["summary_results"] = summary_results
+    else:
+        result["summary"] = executive_summary(model, format_analyses(analyses), paper_id)
+    return result
+
+
+async def generate_comprehensive_analysis_async(paper_text: str, paper_id: str = "") -> Dict[str, Any]:
+    """Async counterpart of generate_comprehensive_analysis."""
+    from src.tools.arxiv_fetcher import COMBINED_SUMMARY, select_best_template_and_generate_summary_async
+
+    model = get_model()
+    templates = await generate_dynamic_templates_async(paper_text, paper_id, model)
+    analyses = await analyze_with_templates_async(paper_text, templates, model=model, paper_id=paper_id)
+
+    result = {"generated_templates": templates, "analyses": analyses}
+    if COMBINED_SUMMARY:
+        summary_results = await select_best_template_and_generate_summary_async(
+            paper_text, templates, analyses, paper_id, model, executive=True
+        )
+        result["summary"] = summary_results["executive_summary"]
+        result["summary_results"] = summary_results
+    else:
+        result["summary"] = await executive_summary_async(model, format_analyses(analyses), paper_id)
+    return result
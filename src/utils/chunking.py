@@ -0,0 +1,200 @@
+"""
+Section-aware, token-budgeted paper context.
+The extracted paper text is split into sections (abstract, introduction,
+method, experiments, ...) and each prompt gets only the sections relevant to
+it, in document order, within a token budget, instead of a fixed-length
+prefix of the paper.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+
+# Rough characters-per-token ratio used for budgeting
+CHARS_PER_TOKEN = 4
+
+# Per-prompt paper-context budgets, in tokens
+TEMPLATE_CONTEXT_TOKENS = int(os.getenv('TEMPLATE_CONTEXT_TOKENS', '1200'))
+ANALYSIS_CONTEXT_TOKENS = int(os.getenv('ANALYSIS_CONTEXT_TOKENS', '1500'))
+SUMMARY_CONTEXT_TOKENS = int(os.getenv('SUMMARY_CONTEXT_TOKENS', '1200'))
+# Don't start another section with less budget left than this many characters
+MIN_SECTION_CHARS = 300
+
+# Heading keywords per section kind, checked in this order
+SECTION_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("abstract", ("abstract",)),
+    ("references", ("references", "bibliography", "acknowledgments", "acknowledgements", "acknowledgment")),
+    ("appendix", ("appendix", "appendices", "supplementary")),
+    ("related_work", ("related work", "prior work", "literature review", "previous work")),
+    ("conclusion", ("conclusion", "conclusions", "concluding remarks", "future work", "summary")),
+    ("introduction", ("introduction", "motivation")),
+    ("background", ("background", "preliminaries", "problem formulation", "problem setup", "problem statement", "notation")),
+    ("experiments", ("experiments", "experiment", "experimental", "evaluation", "implementation details", "datasets", "setup")),
+    ("results", ("results", "ablation", "ablations")),
+    ("discussion", ("discussion", "limitations", "analysis")),
+    ("method", ("method", "methods", "methodology", "approach", "model", "architecture", "framework", "algorithm", "design", "theory")),
+)
+
+# Which sections a template needs, by keywords in its name/prompt; first match wins
+TEMPLATE_SECTIONS: Tuple[Tuple[Tuple[str, ...], Tuple[str, ...]], ...] = (
+    (("math", "equation", "statistic", "formula", "theor", "proof"), ("method", "background", "appendix", "abstract")),
+    (("architect", "design", "model", "method", "mechanism"), ("abstract", "method", "introduction", "background")),
+    (("problem", "motivation", "context", "gap"), ("abstract", "introduction", "related_work", "background")),
+    (("advantage", "trade", "limitation", "performance", "result", "experiment", "benchmark"), ("abstract", "experiments", "results", "discussion", "conclusion")),
+    (("future", "direction", "scope", "open"), ("abstract", "conclusion", "discussion", "results")),
+)
+DEFAULT_SECTIONS = ("abstract", "introduction", "method", "experiments", "results", "conclusion")
+OVERVIEW_SECTIONS = ("abstract", "introduction", "conclusion", "method", "results")
+
+_HEADING = re.compile(r'^(?:(?P<number>\d+(?:\.\d+)*|[IVX]+)\.?\s+)?(?P<title>[A-Z][A-Za-z\-&:,/ ]{2,60})$')
+_INLINE_ABSTRACT = re.compile(r'^abstract\s*[:.\-—–]\s*(?P<rest>\S.*)$', re.IGNORECASE)
+_HEADING_WORDS = {word for _, keywords in SECTION_KEYWORDS for keyword in keywords for word in keyword.split()}
+_FILLER_WORDS = {"and", "of", "the", "our", "a", "with", "on", "main", "proposed", "experimental"}
+_ROMAN = {numeral: value for value, numeral in enumerate(
+    ("I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X", "XI", "XII", "XIII", "XIV", "XV"), start=1
+)}
+
+
+@dataclass(frozen=True)
+class Section:
+    kind: str
+    heading: str
+    text: str
+
+
+def count_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _classify(title: str, numbered: bool) -> str:
+    """
+    Section kind for a heading title. Unnumbered lines only count when made up
+    of heading words ("Related Work", "Conclusion and Future Work"), so wrapped
+    sentence fragments aren't mistaken for headings.
+    """
+    words = re.findall(r'[a-z]+', title.lower())
+    if not numbered and (len(words) > 5 or not set(words) <= _HEADING_WORDS | _FILLER_WORDS):
+        return ""
+    joined = " ".join(words)
+    for kind, keywords in SECTION_KEYWORDS:
+        if any(re.search(rf'\b{keyword}\b', joined) for keyword in keywords):
+            return kind
+    return ""
+
+
+@lru_cache(maxsize=32)
+def _split_sections(text: str) -> Tuple[Section, ...]:
+    sections: List[Section] = []
+    kind, heading, lines = "front", "", []
+    last_number = 0
+
+    def close() -> None:
+        body = "\n".join(lines).strip()
+        if body or heading:
+            sections.append(Section(kind, heading, body))
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        inline = _INLINE_ABSTRACT.match(line)
+        match = _HEADING.match(line) if len(line) <= 70 else None
+        new_kind = ""
+        if inline:
+            new_kind, line = "abstract", inline.group("rest")
+        elif match:
+            number = match.group("number")
+            top_level = int(number) if number and number.isdigit() else _ROMAN.get(number or "")
+            new_kind = _classify(match.group("title"), numbered=bool(number))
+            if top_level:
+                # Top-level numbered heading: must advance the numbering to count
+                if top_level <= last_number or top_level > last_number + 2:
+                    new_kind = ""
+                else:
+                    last_number = top_level
+                    # Paper-specific titles ("3 Sparse Mixture Routing") are method sections
+                    new_kind = new_kind or "method"
+            elif number:
+                # Subsections stay inside their parent section
+                new_kind = ""
+        if new_kind:
+            close()
+            kind, lines = new_kind, []
+            heading = "Abstract" if inline else line
+            if inline:
+                lines.append(line)
+        else:
+            lines.append(raw)
+    close()
+
+    # Text before the first heading usually is the title block plus an unlabelled abstract
+    if sections and sections[0].kind == "front" and not any(s.kind == "abstract" for s in sections):
+        sections[0] = Section("abstract", "", sections[0].text)
+    return tuple(sections)
+
+
+def split_sections(text: str) -> List[Section]:
+    """Sections of the paper in document order; unrecognised text stays with the preceding section."""
+    return list(_split_sections(text))
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Cut at the last paragraph or sentence boundary that fits."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    for boundary in ("\n\n", ". ", "\n"):
+        index = cut.rfind(boundary)
+        if index > max_chars // 2:
+            return cut[:index + 1].rstrip() + " ..."
+    return cut.rstrip() + " ..."
+
+
+def build_context(text: str, kinds: Sequence[str], budget_tokens: int) -> str:
+    """
+    Paper context made of the given section kinds, filled in priority order
+    and emitted in document order, within budget_tokens. Falls back to the
+    start of the paper when no wanted section is found.
+    """
+    budget = max(0, budget_tokens) * CHARS_PER_TOKEN
+    sections = [s for s in _split_sections(text) if s.kind not in ("references", "front")]
+    chosen: Dict[int, str] = {}
+    remaining = budget
+    for kind in kinds:
+        for position, section in enumerate(sections):
+            if section.kind != kind or position in chosen:
+                continue
+            if remaining < MIN_SECTION_CHARS and chosen:
+                break
+            block = f"{section.heading}\n{section.text}".strip() if section.heading else section.text
+            block = _truncate(block, remaining)
+            chosen[position] = block
+            remaining -= len(block) + 2
+    if not chosen:
+        return _truncate(text.strip(), budget)
+    return "\n\n".join(chosen[position] for position in sorted(chosen))
+
+
+def sections_for_template(template_name: str, template_prompt: str = "") -> Tuple[str, ...]:
+    """Section kinds a template needs, judged from its name first and then its prompt."""
+    for haystack in (template_name.lower(), template_prompt.lower()):
+        for keywords, kinds in TEMPLATE_SECTIONS:
+            if any(keyword in haystack for keyword in keywords):
+                return kinds
+    return DEFAULT_SECTIONS
+
+
+def template_context(
+    text: str,
+    template_name: str,
+    template_prompt: str = "",
+    budget_tokens: int = ANALYSIS_CONTEXT_TOKENS
+) -> str:
+    """Context for one analysis template."""
+    return build_context(text, sections_for_template(template_name, template_prompt), budget_tokens)
+
+
+def overview_context(text: str, budget_tokens: int = SUMMARY_CONTEXT_TOKENS) -> str:
+    """Context for whole-paper prompts (template generation, summaries)."""
+    return build_context(text, OVERVIEW_SECTIONS, budget_tokens)
@@ -0,0 +1,298 @@
+"""
+Download manager for paper PDFs.
+Reuses files already present in the download directory (validated against a
+stored size/checksum sidecar), supports conditional GETs via ETag and
+Last-Modified, and streams response bodies to disk through a temp file that
+is atomically renamed into place. One pooled requests.Session is shared for
+keep-alive across downloads, and fetch_async does the same over httpx for
+async callers. A download holds a file lock on its target, so processes
+sharing the directory fetch each PDF once.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import weakref
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Tuple
+
+import httpx
+
+if TYPE_CHECKING:
+    import requests
+
+from src.utils.file_lock import cache_lock
+
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_SIZE', str(64 * 1024)))
+DOWNLOAD_TIMEOUT = float(os.getenv('DOWNLOAD_TIMEOUT', '20'))
+# arXiv PDF URLs are versioned and immutable, so revalidation is opt-in
+DOWNLOAD_REVALIDATE = os.getenv('DOWNLOAD_REVALIDATE', '0') == '1'
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _looks_like_pdf(path: Path) -> bool:
+    """Cheap completeness check for files downloaded before sidecars existed."""
+    try:
+        size = path.stat().st_size
+        with open(path, 'rb') as f:
+            head = f.read(5)
+            f.seek(max(0, size - 1024))
+            tail = f.read()
+        return head == b'%PDF-' and b'%%EOF' in tail
+    except OSError:
+        return False
+
+
+class DownloadManager:
+    """Fetch URLs into a local directory, reusing valid local copies."""
+
+    def __init__(self, download_dir: str = "./pdfs", session: Optional["requests.Session"] = None):
+        # Imported here so server startup doesn't pay for requests until the first download
+        import requests
+
+        self.download_dir = Path(download_dir)
+        self.session = session or requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.reused = 0
+        self.not_modified = 0
+        self.downloaded = 0
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _meta_path(self, file_path: Path) -> Path:
+        return file_path.with_name(file_path.name + '.meta.json')
+
+    def _read_meta(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path(file_path)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, file_path: Path, meta: Dict[str, Any]) -> None:
+        meta_path = self._meta_path(file_path)
+        fd, tmp_path = tempfile.mkstemp(dir=str(file_path.parent), suffix='.part')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _is_valid(self, file_path: Path, meta: Optional[Dict[str, Any]], verify_checksum: bool) -> bool:
+        if meta is None or not file_path.exists():
+            return False
+        if file_path.stat().st_size != meta.get('size'):
+            return False
+        if verify_checksum and file_sha256(file_path) != meta.get('sha256'):
+            return False
+        return True
+
+    def _prepare(
+        self,
+        url: str,
+        filename: Optional[str],
+        revalidate: bool,
+        verify_checksum: bool
+    ) -> Tuple[Path, bool, Optional[Dict[str, str]]]:
+        """
+        Work out whether url needs a request.
+        Returns (file_path, valid, headers); headers is None when the local copy
+        can be reused without touching the network.
+        """
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        file_path = self.download_dir / (filename or url.split('/')[-1])
+        meta = self._read_meta(file_path)
+
+        if meta is None and file_path.exists() and _looks_like_pdf(file_path):
+            # Adopt a complete file left by an earlier run
+            meta = {'url': url, 'size': file_path.stat().st_size, 'sha256': file_sha256(file_path)}
+            self._write_meta(file_path, meta)
+
+        valid = self._is_valid(file_path, meta, verify_checksum)
+        if valid and not revalidate:
+            self.reused += 1
+            return file_path, valid, None
+
+        headers = {}
+        if valid and meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return file_path, valid, headers
+
+    def fetch(
+        self,
+        url: str,
+        filename: Optional[str] = None,
+        revalidate: bool = DOWNLOAD_REVALIDATE,
+        verify_checksum: bool = False
+    ) -> str:
+        """
+        Return the local path for url, downloading only when needed.
+        With revalidate=True a conditional GET is sent and a 304 reuses the local copy.
+        Raises on network or HTTP errors.
+        """
+        file_path, valid, headers = self._prepare(url, filename, revalidate, verify_checksum)
+        if headers is None:
+            return str(file_path)
+
+        with cache_lock(f"pdf:{file_path.resolve()}") as waited:
+            if waited:
+                # Another process held the download; its copy is usually reusable now
+                file_path, valid, headers = self._prepare(url, filename, False, verify_checksum)
+                if headers is None:
+                    return str(file_path)
+
+            with self.session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                if response.status_code == 304 and valid:
+                    self.not_modified += 1
+                    return str(file_path)
+                response.raise_for_status()
+                new_meta = self._stream_to_file(
+                    response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE),
+                    response.headers,
+                    file_path
+                )
+
+            new_meta['url'] = url
+            self._write_meta(file_path, new_meta)
+        self.downloaded += 1
+        return str(file_path)
+
+    async def fetch_async(
+        self,
+        url: str,
+        filename: Optional[str] = None,
+        revalidate: bool = DOWNLOAD_REVALIDATE,
+        verify_checksum: bool = False
+    ) -> str:
+        """Async counterpart of fetch, using a pooled httpx.AsyncClient."""
+        file_path, valid, headers = self._prepare(url, filename, revalidate, verify_checksum)
+        if headers is None:
+            return str(file_path)
+
+        lock = cache_lock(f"pdf:{file_path.resolve()}")
+        waited = await lock.acquire_async()
+        try:
+            if waited:
+                file_path, valid, headers = self._prepare(url, filename, False, verify_checksum)
+                if headers is None:
+                    return str(file_path)
+            return await self._download_async(url, file_path, valid, headers)
+        finally:
+            lock.release()
+
+    async def _download_async(
+        self,
+        url: str,
+        file_path: Path,
+        valid: bool,
+        headers: Dict[str, str]
+    ) -> str:
+        client = self._get_async_client()
+        async with client.stream('GET', url, headers=headers) as response:
+            if response.status_code == 304 and valid:
+                self.not_modified += 1
+                return str(file_path)
+            response.raise_for_status()
+            digest = hashlib.sha256()
+            size = 0
+            fd, tmp_path = tempfile.mkstemp(dir=str(file_path.parent), prefix=file_path.name, suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                self._check_length(response.headers, size)
+                os.replace(tmp_path, file_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+
+        self._write_meta(file_path, {
+            'url': url,
+            'size': size,
+            'sha256': digest.hexdigest(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        })
+        self.downloaded += 1
+        return str(file_path)
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """One AsyncClient per event loop, since httpx clients are loop-bound."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=DOWNLOAD_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=8)
+            )
+            self._async_clients[loop] = client
+        return client
+
+    @staticmethod
+    def _check_length(headers: Any, size: int) -> None:
+        expected = headers.get('Content-Length')
+        if expected is not None and 'Content-Encoding' not in headers and int(expected) != size:
+            raise IOError(f"Incomplete download: got {size} of {expected} bytes")
+
+    def _stream_to_file(self, chunks: Iterable[bytes], headers: Any, file_path: Path) -> Dict[str, Any]:
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=str(file_path.parent), prefix=file_path.name, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+            self._check_length(headers, size)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return {
+            'size': size,
+            'sha256': digest.hexdigest(),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified')
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "reused": self.reused,
+            "not_modified": self.not_modified,
+            "downloaded": self.downloaded
+        }
+
+
+_managers: Dict[str, DownloadManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_download_manager(download_dir: str = "./pdfs") -> DownloadManager:
+    """Shared manager (and session) per download directory."""
+    key = str(Path(download_dir).resolve())
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = DownloadManager(download_dir)
+        return _managers[key]
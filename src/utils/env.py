@@ -0,0 +1,40 @@
+"""
+Process initialization shared by every entry point.
+Modules read their configuration from the environment at import time, so
+entry points call init_process() first: it loads .env and sets up logging,
+once per process. Heavy dependencies (google.generativeai, arxiv, pypdf,
+requests) are not imported here or by tool registration; each is imported
+by the code that first needs it, and clients are created by their get_xxx()
+accessors on first use.
+"""
+
+import logging
+import os
+import sys
+import threading
+
+
+_initialized = False
+_lock = threading.Lock()
+
+
+def load_environment() -> None:
+    """Load .env into os.environ (existing variables win); later calls are no-ops."""
+    global _initialized
+    with _lock:
+        if _initialized:
+            return
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _initialized = True
+
+
+def init_process() -> None:
+    """Load .env and log to stderr, which stays clear of the stdio transport's protocol messages."""
+    load_environment()
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=os.getenv('LOG_LEVEL', 'INFO'),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
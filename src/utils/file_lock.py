@@ -0,0 +1,180 @@
+"""
+Cross-process locks on cache keys.
+Several server instances and worker processes share the caches under
+./pdfs (PDFs, text sidecars, the LLM cache). A FileLock around a cache miss
+lets exactly one process download, extract or generate a given entry while
+the others wait and then read it from the cache. Locks are flock()ed files
+under ./pdfs/locks, one per key, removed again on release. Without fcntl
+(Windows) they fall back to in-process locks. Async callers never block a
+thread on a lock: coroutines of one process queue on a per-key asyncio.Lock,
+and the one at the front polls the file lock between asyncio.sleep()s.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+LOCK_DIR = os.getenv('LOCK_DIR', './pdfs/locks')
+SHARED_CACHE_LOCKS = os.getenv('SHARED_CACHE_LOCKS', '1') != '0'
+# Seconds between attempts while an async caller waits for another process's lock
+LOCK_POLL_INTERVAL = float(os.getenv('LOCK_POLL_INTERVAL', '0.05'))
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+# (event loop id, key) -> [asyncio.Lock, coroutines holding or waiting for it]
+_async_locks: Dict[Tuple[int, str], List] = {}
+
+
+class AsyncKeyLock:
+    """
+    In-process asyncio lock on a key: coroutines on the same event loop
+    wanting the same key wait here instead of on worker threads.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._slot: Optional[Tuple[int, str]] = None
+
+    async def acquire(self) -> bool:
+        """Wait for the key; returns True if another coroutine held it."""
+        slot = (id(asyncio.get_running_loop()), self.key)
+        with _local_locks_guard:
+            entry = _async_locks.setdefault(slot, [asyncio.Lock(), 0])
+            entry[1] += 1
+        self._slot = slot
+        waited = entry[0].locked()
+        try:
+            await entry[0].acquire()
+        except BaseException:
+            self._drop()
+            raise
+        return waited
+
+    def release(self) -> None:
+        if self._slot is not None:
+            _async_locks[self._slot][0].release()
+            self._drop()
+
+    def _drop(self) -> None:
+        with _local_locks_guard:
+            entry = _async_locks[self._slot]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _async_locks[self._slot]
+        self._slot = None
+
+
+class FileLock:
+    """Exclusive lock on a key, held across processes (and threads) on this host."""
+
+    def __init__(self, key: str, lock_dir: str = LOCK_DIR):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+        self.key = key
+        self.path = Path(lock_dir) / f"{digest}.lock"
+        self._fd: Optional[int] = None
+        self._local: Optional[threading.Lock] = None
+        self._async: Optional[AsyncKeyLock] = None
+
+    def _try_acquire(self, blocking: bool) -> bool:
+        """One attempt at the lock; False if it is held elsewhere (or was replaced while waiting)."""
+        if fcntl is None:
+            with _local_locks_guard:
+                local = _local_locks.setdefault(self.key, threading.Lock())
+            if not local.acquire(blocking=blocking):
+                return False
+            self._local = local
+            return True
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        # The previous holder may have unlinked the file while we waited; retry on the new one
+        try:
+            if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                self._fd = fd
+                return True
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+        return False
+
+    def acquire(self) -> bool:
+        """Block until the lock is held; returns True if another holder had to be waited for."""
+        if self._try_acquire(blocking=False):
+            return False
+        while not self._try_acquire(blocking=True):
+            pass
+        return True
+
+    async def acquire_async(self) -> bool:
+        """
+        acquire() for coroutines, without parking a thread: wait on the key's
+        AsyncKeyLock, then poll the file lock with LOCK_NB between sleeps.
+        """
+        self._async = AsyncKeyLock(self.key)
+        waited = await self._async.acquire()
+        try:
+            while not self._try_acquire(blocking=False):
+                waited = True
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+        except BaseException:
+            self._async.release()
+            self._async = None
+            raise
+        return waited
+
+    def release(self) -> None:
+        if self._local is not None:
+            self._local.release()
+            self._local = None
+        if self._fd is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            os.close(self._fd)
+            self._fd = None
+        if self._async is not None:
+            self._async.release()
+            self._async = None
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class _NoLock:
+    def acquire(self) -> bool:
+        return False
+
+    async def acquire_async(self) -> bool:
+        return False
+
+    def release(self) -> None:
+        pass
+
+    def __enter__(self) -> bool:
+        return False
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+def cache_lock(key: str):
+    """FileLock for a cache key, or a no-op lock when SHARED_CACHE_LOCKS=0."""
+    return FileLock(key) if SHARED_CACHE_LOCKS else _NoLock()
@@ -8,3 +8,14 @@ def get_prompt_instruction(template_key: Optional[str], prompt_templates: Dict[s
     if not template_key or template_key not in prompt_templates:
         return prompt_templates["new_architecture"]
     return prompt_templates[template_key]
+
+def strip_code_fences(text: str) -> str:
+    """Remove a surrounding ```json / ``` markdown block from a model response."""
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
@@ -0,0 +1,289 @@
+"""
+Persistent store for batch summarization jobs.
+A job is a list of papers; each paper row carries the last completed stage
+(downloaded, extracted, templated, analyzed, summarized) with a JSON
+checkpoint of the work done so far. Workers in any number of processes claim
+papers under a time-limited lease, so a paper abandoned by a crashed worker
+is picked up again and resumed from its last checkpoint. Every write for a
+claimed paper is conditional on the writer still holding its lease, so a
+worker whose lease expired can't overwrite the one that took over (it gets
+LeaseLost instead). A worker given a
+shard (index, count) prefers papers whose arXiv ID hashes to its shard, so
+each paper's caches and in-flight work stay with one process; it takes
+other shards' papers only when its own are done.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.paper_index import parse_arxiv_id
+
+
+JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', './pdfs/jobs.sqlite3')
+# A claimed paper whose lease isn't renewed within this long is considered abandoned
+# (workers renew it at every checkpoint and in the background while a stage runs)
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '600'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+
+STAGES = ("pending", "downloaded", "extracted", "templated", "analyzed", "summarized")
+FAILED = "failed"
+
+
+def shard_key(arxiv_id: str) -> int:
+    """Stable hash of the unversioned arXiv ID, so every version of a paper lands on the same shard."""
+    parsed = parse_arxiv_id(arxiv_id)
+    base_id = parsed[0] if parsed else arxiv_id
+    return int.from_bytes(hashlib.blake2b(base_id.encode('utf-8'), digest_size=4).digest(), 'big')
+
+
+class LeaseLost(Exception):
+    """The claim's lease expired and another worker has (or may have) taken the paper over."""
+
+
+@dataclass
+class ClaimedPaper:
+    job_id: str
+    position: int
+    stage: str
+    state: Dict[str, Any]
+    attempts: int
+    worker_id: str
+
+
+class JobStore:
+    """SQLite-backed jobs and per-paper checkpoints, safe to share between processes."""
+
+    def __init__(self, path: str = JOB_STORE_PATH, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; multi-statement updates use explicit BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                params TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_papers (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                arxiv_id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                state TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                shard_key INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS job_papers_open ON job_papers (stage, lease_expires);
+            """
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(job_papers)")}
+        if "shard_key" not in columns:
+            # Stores created before sharding; their papers stay on shard 0
+            self._conn.execute("ALTER TABLE job_papers ADD COLUMN shard_key INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def create_job(self, papers: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        """Record a job over the given paper metadata dicts; returns its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, params, total, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(params), len(papers), now)
+            )
+            conn.executemany(
+                "INSERT INTO job_papers (job_id, position, arxiv_id, title, stage, state, shard_key, updated_at) "
+                "VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)",
+                [
+                    (
+                        job_id, position, paper["arxiv_id"], paper["title"], json.dumps(paper),
+                        shard_key(paper["arxiv_id"]), now
+                    )
+                    for position, paper in enumerate(papers)
+                ]
+            )
+        return job_id
+
+    def claim(self, worker_id: str, shard: Optional[Tuple[int, int]] = None) -> Optional[ClaimedPaper]:
+        """
+        Lease the oldest unfinished paper that no live worker holds, if any,
+        preferring papers of the given (index, count) shard.
+        """
+        now = time.time()
+        index, count = shard or (0, 1)
+        with self._transaction() as conn:
+            row = conn.execute(
+                """
+                SELECT p.job_id, p.position, p.stage, p.state, p.attempts FROM job_papers p
+                JOIN jobs j ON j.job_id = p.job_id
+                WHERE p.stage NOT IN ('summarized', 'failed')
+                  AND (p.lease_owner IS NULL OR p.lease_expires < ?)
+                ORDER BY p.shard_key % ? != ?, j.created_at, p.position LIMIT 1
+                """,
+                (now, count, index)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE job_papers SET lease_owner=?, lease_expires=?, attempts=attempts+1, updated_at=? "
+                "WHERE job_id=? AND position=?",
+                (worker_id, now + self.lease_seconds, now, row["job_id"], row["position"])
+            )
+        return ClaimedPaper(
+            row["job_id"], row["position"], row["stage"], json.loads(row["state"]), row["attempts"] + 1, worker_id
+        )
+
+    def _update_claimed(self, claim: ClaimedPaper, assignments: str, values: Tuple[Any, ...]) -> None:
+        """
+        UPDATE the claimed paper's row, only while this claim still owns the
+        lease (an expired lease nobody has reclaimed yet still counts); raises LeaseLost otherwise.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                f"UPDATE job_papers SET {assignments} WHERE job_id=? AND position=? AND lease_owner=?",
+                values + (claim.job_id, claim.position, claim.worker_id)
+            )
+            if cursor.rowcount == 0:
+                raise LeaseLost(f"{claim.worker_id} no longer holds job {claim.job_id} paper {claim.position}")
+
+    def renew(self, claim: ClaimedPaper) -> None:
+        """Extend the claim's lease; raises LeaseLost if another worker has taken the paper over."""
+        now = time.time()
+        self._update_claimed(claim, "lease_expires=?, updated_at=?", (now + self.lease_seconds, now))
+
+    def checkpoint(self, claim: ClaimedPaper, stage: str, state: Dict[str, Any]) -> None:
+        """Persist a completed stage and renew the lease."""
+        now = time.time()
+        self._update_claimed(
+            claim,
+            "stage=?, state=?, lease_expires=?, updated_at=?",
+            (stage, json.dumps(state), now + self.lease_seconds, now)
+        )
+        claim.stage = stage
+
+    def complete(self, claim: ClaimedPaper, result: Dict[str, Any]) -> None:
+        """Store the paper's result; a result carrying an "error" (e.g. no extractable text) counts as failed."""
+        now = time.time()
+        stage = FAILED if result.get("error") else "summarized"
+        self._update_claimed(
+            claim,
+            "stage=?, result=?, error=?, lease_owner=NULL, lease_expires=NULL, updated_at=?",
+            (stage, json.dumps(result), result.get("error"), now)
+        )
+
+    def release(self, claim: ClaimedPaper, error: str, max_attempts: int = JOB_MAX_ATTEMPTS) -> None:
+        """Give the paper back after an error, or mark it failed once attempts run out."""
+        now = time.time()
+        stage = FAILED if claim.attempts >= max_attempts else claim.stage
+        self._update_claimed(
+            claim,
+            "stage=?, error=?, lease_owner=NULL, lease_expires=NULL, updated_at=?",
+            (stage, error, now)
+        )
+
+    def has_open_work(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM job_papers WHERE stage NOT IN ('summarized', 'failed') LIMIT 1"
+            ).fetchone()
+        return row is not None
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job parameters, per-stage counts and per-paper progress; None for an unknown id."""
+        with self._lock:
+            job = self._conn.execute("SELECT * FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            papers = self._conn.execute(
+                "SELECT position, arxiv_id, title, stage, error, attempts, lease_owner, updated_at "
+                "FROM job_papers WHERE job_id=? ORDER BY position",
+                (job_id,)
+            ).fetchall()
+        counts = {stage: 0 for stage in STAGES + (FAILED,)}
+        for paper in papers:
+            counts[paper["stage"]] += 1
+        finished = counts["summarized"] + counts[FAILED]
+        if finished == len(papers):
+            status = "completed" if not counts[FAILED] else "completed_with_errors"
+        elif any(paper["lease_owner"] for paper in papers) or finished:
+            status = "running"
+        else:
+            status = "queued"
+        return {
+            "job_id": job_id,
+            "status": status,
+            "params": json.loads(job["params"]),
+            "total": job["total"],
+            "finished": finished,
+            "stages": counts,
+            "created_at": job["created_at"],
+            "papers": [
+                {
+                    "arxiv_id": paper["arxiv_id"],
+                    "title": paper["title"],
+                    "stage": paper["stage"],
+                    "attempts": paper["attempts"],
+                    "error": paper["error"]
+                }
+                for paper in papers
+            ]
+        }
+
+    def get_results(self, job_id: str) -> List[Dict[str, Any]]:
+        """Results of the job's finished papers, in submission order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT arxiv_id, title, stage, result, error FROM job_papers "
+                "WHERE job_id=? AND stage IN ('summarized', 'failed') ORDER BY position",
+                (job_id,)
+            ).fetchall()
+        return [
+            json.loads(row["result"]) if row["result"] else
+            {"arxiv_id": row["arxiv_id"], "title": row["title"], "error": row["error"]}
+            for row in rows
+        ]
+
+
+_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """Shared store instance for this process."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore()
+        return _store
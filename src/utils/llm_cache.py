@@ -0,0 +1,338 @@
+"""
+Persistent, content-addressed cache for LLM stage outputs.
+Entries are keyed by (paper id/version, hash of the rendered prompt, model name)
+and stored in SQLite next to the downloaded PDFs, with a TTL and a
+size-bounded LRU eviction policy. Misses are generated under a file lock on
+the prompt, so processes sharing the cache make each call only once.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.utils.file_lock import cache_lock
+from src.utils.metrics import record_llm_call
+from src.utils.scheduler import estimate_tokens, get_scheduler
+
+
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', '1') != '0'
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', './pdfs/llm_cache.sqlite3')
+LLM_CACHE_TTL_SECONDS = float(os.getenv('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+# Eviction frees space down to this fraction of max_bytes, so it runs once per batch of puts, not on every put
+LLM_CACHE_EVICT_TO = 0.9
+
+
+def hash_prompt(prompt: str) -> str:
+    """Stable content hash of a rendered prompt."""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+def get_model_name(model: Any) -> str:
+    """Best-effort model identifier used as part of the cache key."""
+    return str(getattr(model, 'model_name', None) or type(model).__name__)
+
+
+class LLMCache:
+    """SQLite-backed LRU cache with TTL and hit/miss counters."""
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        max_bytes: int = LLM_CACHE_MAX_BYTES
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # Running size of the table as seen by this process; recounted whenever it crosses max_bytes
+        self._total: Optional[int] = None
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                paper_id TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (paper_id, prompt_hash, model)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, paper_id: str, prompt: str, model: str) -> Optional[str]:
+        """Return the cached response, or None on a miss or expired entry."""
+        key = (paper_id, hash_prompt(prompt), model)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE paper_id=? AND prompt_hash=? AND model=?",
+                key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, created_at = row
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE paper_id=? AND prompt_hash=? AND model=?", key
+                )
+                self._conn.commit()
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed_at=? WHERE paper_id=? AND prompt_hash=? AND model=?",
+                (now,) + key
+            )
+            self._conn.commit()
+            self.hits += 1
+            return response
+
+    def put(self, paper_id: str, prompt: str, model: str, response: str) -> None:
+        """Store a response and evict least recently used entries over the size bound."""
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        key = (paper_id, hash_prompt(prompt), model)
+        with self._lock:
+            if self._total is None:
+                self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            replaced = self._conn.execute(
+                "SELECT size FROM llm_cache WHERE paper_id=? AND prompt_hash=? AND model=?", key
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                key + (response, size, now, now)
+            )
+            self._total += size - (replaced[0] if replaced else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the table is back under the low-water mark."""
+        # Other processes sharing the file may have added or evicted entries since the last count
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - int(self.max_bytes * LLM_CACHE_EVICT_TO)
+            victims = []
+            freed = 0
+            # Lazy cursor over the accessed_at index: reads only as many rows as need evicting
+            for rowid, size in self._conn.execute("SELECT rowid, size FROM llm_cache ORDER BY accessed_at"):
+                if freed >= excess:
+                    break
+                victims.append(rowid)
+                freed += size
+            for start in range(0, len(victims), 500):
+                batch = victims[start:start + 500]
+                self._conn.execute(
+                    f"DELETE FROM llm_cache WHERE rowid IN ({','.join('?' * len(batch))})", batch
+                )
+            total -= freed
+            self.evictions += len(victims)
+        self._total = total
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._total = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus current on-disk footprint."""
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Shared cache instance, or None when LLM_CACHE_ENABLED=0."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+def _lock_key(model_name: str, prompt: str) -> str:
+    return f"llm:{model_name}:{hash_prompt(prompt)}"
+
+
+def _generate(model: Any, prompt: str, model_name: str, stage: str, start: float, coalesce: bool = True) -> str:
+    try:
+        response = get_scheduler().call(
+            (model_name, hash_prompt(prompt)) if coalesce else None,
+            lambda: model.generate_content(prompt),
+            estimate_tokens(prompt),
+            stage=stage
+        )
+        text = response.text
+    except Exception:
+        record_llm_call(stage, time.perf_counter() - start, prompt, None, cache_hit=False, error=True)
+        raise
+    record_llm_call(
+        stage, time.perf_counter() - start, prompt, text,
+        cache_hit=False, usage=getattr(response, 'usage_metadata', None)
+    )
+    return text
+
+
+async def _generate_async(
+    model: Any,
+    prompt: str,
+    model_name: str,
+    stage: str,
+    start: float,
+    coalesce: bool = True
+) -> str:
+    try:
+        response = await get_scheduler().call_async(
+            (model_name, hash_prompt(prompt)) if coalesce else None,
+            lambda: model.generate_content_async(prompt),
+            estimate_tokens(prompt),
+            stage=stage
+        )
+        text = response.text
+    except Exception:
+        record_llm_call(stage, time.perf_counter() - start, prompt, None, cache_hit=False, error=True)
+        raise
+    record_llm_call(
+        stage, time.perf_counter() - start, prompt, text,
+        cache_hit=False, usage=getattr(response, 'usage_metadata', None)
+    )
+    return text
+
+
+def _generate_miss(
+    cache: "LLMCache",
+    model: Any,
+    prompt: str,
+    paper_id: str,
+    model_name: str,
+    stage: str,
+    start: float
+) -> str:
+    """Generate and cache a missing entry under the cross-process lock on the prompt."""
+    with cache_lock(_lock_key(model_name, prompt)) as waited:
+        # Whoever held the lock has usually just cached the response
+        cached = cache.get(paper_id, prompt, model_name) if waited else None
+        if cached is None:
+            text = _generate(model, prompt, model_name, stage, start, coalesce=False)
+            cache.put(paper_id, prompt, model_name, text)
+            return text
+    record_llm_call(stage, time.perf_counter() - start, prompt, cached, cache_hit=True)
+    return cached
+
+
+async def _generate_miss_async(
+    cache: "LLMCache",
+    model: Any,
+    prompt: str,
+    paper_id: str,
+    model_name: str,
+    stage: str,
+    start: float
+) -> str:
+    lock = cache_lock(_lock_key(model_name, prompt))
+    waited = await lock.acquire_async()
+    try:
+        cached = await asyncio.to_thread(cache.get, paper_id, prompt, model_name) if waited else None
+        if cached is None:
+            text = await _generate_async(model, prompt, model_name, stage, start, coalesce=False)
+            await asyncio.to_thread(cache.put, paper_id, prompt, model_name, text)
+            return text
+    finally:
+        lock.release()
+    record_llm_call(stage, time.perf_counter() - start, prompt, cached, cache_hit=True)
+    return cached
+
+
+def cached_generate(model: Any, prompt: str, paper_id: str = "", stage: str = "llm") -> str:
+    """
+    Return model.generate_content(prompt).text, served from the cache when possible.
+    The prompt hash already covers the paper text, so paper_id may be empty for
+    callers that don't know the arXiv ID. Errors are not cached. Concurrent
+    misses on the same prompt in this process share one lookup-and-generate
+    (scheduler coalescing), which runs under the prompt's file lock so other
+    processes wait for it too; the model call itself goes through the shared
+    scheduler (rate limits, retries). Every call is recorded in the metrics
+    registry under the given stage label; calls that shared another's
+    response count as cache hits.
+    """
+    start = time.perf_counter()
+    cache = get_llm_cache()
+    model_name = get_model_name(model)
+    if cache is None:
+        return _generate(model, prompt, model_name, stage, start)
+
+    cached = cache.get(paper_id, prompt, model_name)
+    if cached is None:
+        text, shared = get_scheduler().coalesce(
+            (model_name, hash_prompt(prompt)),
+            lambda: _generate_miss(cache, model, prompt, paper_id, model_name, stage, start),
+            stage
+        )
+        if not shared:
+            return text
+        cached = text
+    record_llm_call(stage, time.perf_counter() - start, prompt, cached, cache_hit=True)
+    return cached
+
+
+async def cached_generate_async(model: Any, prompt: str, paper_id: str = "", stage: str = "llm") -> str:
+    """Async counterpart of cached_generate using model.generate_content_async."""
+    start = time.perf_counter()
+    cache = get_llm_cache()
+    model_name = get_model_name(model)
+    if cache is None:
+        return await _generate_async(model, prompt, model_name, stage, start)
+
+    cached = await asyncio.to_thread(cache.get, paper_id, prompt, model_name)
+    if cached is None:
+        text, shared = await get_scheduler().coalesce_async(
+            (model_name, hash_prompt(prompt)),
+            lambda: _generate_miss_async(cache, model, prompt, paper_id, model_name, stage, start),
+            stage
+        )
+        if not shared:
+            return text
+        cached = text
+    record_llm_call(stage, time.perf_counter() - start, prompt, cached, cache_hit=True)
+    return cached
@@ -0,0 +1,210 @@
+"""
+In-process instrumentation for the hot path.
+Latency histograms and counters keyed by metric name plus labels, with a
+JSON-friendly snapshot and a Prometheus text exposition.
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound containing the q-th observation."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float('inf'),), self.counts):
+            seen += n
+            if seen >= target:
+                return bound if bound != float('inf') else self.max
+        return self.max
+
+
+class Metrics:
+    """Thread-safe registry of counters and latency histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels: Any) -> None:
+        """Add an observation; buckets applies when the series is first created."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values as plain dicts: counters, and per-histogram count/sum/mean/p50/p95/max."""
+        with self._lock:
+            counters = {
+                name: [dict(dict(key), value=value) for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    dict(
+                        dict(key),
+                        count=h.count,
+                        sum=round(h.sum, 6),
+                        mean=round(h.sum / h.count, 6) if h.count else None,
+                        p50=h.quantile(0.5),
+                        p95=h.quantile(0.95),
+                        max=round(h.max, 6)
+                    )
+                    for key, h in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "counters": counters,
+            "histograms": histograms
+        }
+
+    def to_prometheus(self, prefix: str = "paper_summarizer_") -> str:
+        """Prometheus text exposition format."""
+        def fmt_labels(key: LabelKey, extra: Optional[List[Tuple[str, str]]] = None) -> str:
+            pairs = list(key) + (extra or [])
+            if not pairs:
+                return ""
+            escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric = prefix + name
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in series.items():
+                    lines.append(f"{metric}{fmt_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                metric = prefix + name
+                lines.append(f"# TYPE {metric} histogram")
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, n in zip(h.buckets, h.counts):
+                        cumulative += n
+                        lines.append(f"{metric}_bucket{fmt_labels(key, [('le', str(bound))])} {cumulative}")
+                    lines.append(f"{metric}_bucket{fmt_labels(key, [('le', '+Inf')])} {h.count}")
+                    lines.append(f"{metric}_sum{fmt_labels(key)} {h.sum}")
+                    lines.append(f"{metric}_count{fmt_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry for the whole process
+metrics = Metrics()
+
+
+@contextmanager
+def timed(operation: str, **labels: Any) -> Iterator[None]:
+    """Record the block's latency under operation_seconds and count raised errors."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        metrics.inc("errors_total", operation=operation, **labels)
+        raise
+    finally:
+        metrics.observe("operation_seconds", time.perf_counter() - start, operation=operation, **labels)
+        metrics.inc("operations_total", operation=operation, **labels)
+
+
+def instrumented(operation: str, is_error: Optional[Callable[[Any], bool]] = None) -> Callable:
+    """
+    Decorator form of timed(). is_error flags returned values that represent
+    failures, for functions that report errors as result strings.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(operation):
+                result = func(*args, **kwargs)
+            if is_error is not None and is_error(result):
+                metrics.inc("errors_total", operation=operation)
+            return result
+        return wrapper
+    return decorator
+
+
+def is_error_string(result: Any) -> bool:
+    return isinstance(result, str) and result.startswith("Error")
+
+
+def record_llm_call(
+    stage: str,
+    seconds: float,
+    prompt: str,
+    response_text: Optional[str],
+    cache_hit: bool,
+    usage: Any = None,
+    error: bool = False
+) -> None:
+    """Account one LLM request: latency, sizes, token counts, cache outcome and errors."""
+    cache = "hit" if cache_hit else "miss"
+    metrics.inc("llm_requests_total", stage=stage, cache=cache)
+    metrics.observe("llm_seconds", seconds, stage=stage, cache=cache)
+    metrics.inc("llm_prompt_chars_total", len(prompt), stage=stage)
+    if error:
+        metrics.inc("llm_errors_total", stage=stage)
+        return
+    metrics.inc("llm_response_chars_total", len(response_text or ""), stage=stage)
+    if cache_hit:
+        return
+    # Prefer the backend's own token accounting; otherwise estimate ~4 chars/token
+    prompt_tokens = getattr(usage, 'prompt_token_count', None)
+    response_tokens = getattr(usage, 'candidates_token_count', None)
+    metrics.inc("llm_prompt_tokens_total", prompt_tokens if prompt_tokens is not None else len(prompt) // 4, stage=stage)
+    metrics.inc(
+        "llm_response_tokens_total",
+        response_tokens if response_tokens is not None else len(response_text or "") // 4,
+        stage=stage
+    )
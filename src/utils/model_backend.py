@@ -0,0 +1,187 @@
+"""
+Model backend selection.
+Every LLM call goes through the single shared model returned by get_model().
+MODEL_BACKEND=gemini (default) uses google.generativeai; MODEL_BACKEND=local
+uses LocalModel, a deterministic offline stand-in with configurable latency,
+token throughput and failure rate for benchmarking and load tests.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from src.utils.env import load_environment
+
+
+# No-op when an entry point already ran init_process()
+load_environment()
+
+MODEL_BACKEND = os.getenv('MODEL_BACKEND', 'gemini')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash-exp')
+
+LOCAL_MODEL_LATENCY = float(os.getenv('LOCAL_MODEL_LATENCY', '0.05'))
+LOCAL_MODEL_TOKENS_PER_SECOND = float(os.getenv('LOCAL_MODEL_TOKENS_PER_SECOND', '0'))
+LOCAL_MODEL_FAILURE_RATE = float(os.getenv('LOCAL_MODEL_FAILURE_RATE', '0'))
+LOCAL_MODEL_RESPONSE_TOKENS = int(os.getenv('LOCAL_MODEL_RESPONSE_TOKENS', '300'))
+LOCAL_MODEL_SEED = int(os.getenv('LOCAL_MODEL_SEED', '0'))
+
+# Rough characters-per-token ratio used for the local model's accounting
+CHARS_PER_TOKEN = 4
+
+
+class SimulatedModelError(Exception):
+    """Failure injected by LocalModel; code mirrors the HTTP status it simulates."""
+
+    def __init__(self, message: str, code: int = 429):
+        super().__init__(message)
+        self.code = code
+
+
+class LocalResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class LocalModel:
+    """
+    Offline stand-in for genai.GenerativeModel.
+    Responses are a deterministic function of the prompt and are shaped like
+    what each pipeline stage expects (template JSON, selection JSON, combined
+    summary JSON, or prose). Each call sleeps latency plus response tokens
+    divided by tokens_per_second (0 = unlimited), and fails with
+    SimulatedModelError at failure_rate using a seeded RNG.
+    """
+
+    def __init__(
+        self,
+        latency: float = LOCAL_MODEL_LATENCY,
+        tokens_per_second: float = LOCAL_MODEL_TOKENS_PER_SECOND,
+        failure_rate: float = LOCAL_MODEL_FAILURE_RATE,
+        response_tokens: int = LOCAL_MODEL_RESPONSE_TOKENS,
+        seed: int = LOCAL_MODEL_SEED,
+        model_name: str = 'local-model'
+    ):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.response_tokens = response_tokens
+        self.model_name = model_name
+        self.calls = 0
+        self.failures = 0
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _prose(self, prompt: str, tokens: int) -> str:
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        words = [digest[i:i + 3] for i in range(0, len(digest), 3)]
+        return " ".join(words[i % len(words)] for i in range(tokens))
+
+    def _respond(self, prompt: str) -> str:
+        if "generate 3-5 focused analysis templates" in prompt:
+            return json.dumps({"templates": [
+                {
+                    "name": name,
+                    "description": f"Local analysis of {name.replace('_', ' ')}",
+                    "prompt": f"Analyze the {name.replace('_', ' ')} of this paper in depth.\n\nPaper text: {{text}}"
+                }
+                for name in ("architecture_evolution", "mathematical_foundations", "problem_and_motivation",
+                             "advantages_and_tradeoffs", "future_research")
+            ]})
+        if '"executive_summary"' in prompt:
+            names = re.search(r"Must be exactly one of: (.+)", prompt)
+            selected = names.group(1).split(", ")[0].strip() if names else "architecture_evolution"
+            return json.dumps({
+                "selected_template": selected,
+                "reasoning": self._prose(prompt + "reasoning", 40),
+                "focused_summary": self._prose(prompt + "focused", self.response_tokens),
+                "holistic_summary": self._prose(prompt + "holistic", self.response_tokens),
+                "executive_summary": self._prose(prompt + "executive", 60)
+            })
+        if '"selected_template"' in prompt:
+            names = re.findall(r'^=== (.+) ===$', prompt, re.MULTILINE)
+            return json.dumps({
+                "selected_template": names[0] if names else "architecture_evolution",
+                "reasoning": self._prose(prompt, 40)
+            })
+        return self._prose(prompt, self.response_tokens)
+
+    def _account(self, prompt: str) -> float:
+        """Record the call, maybe inject a failure, and return the simulated duration."""
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            failed = self._random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        if failed:
+            raise SimulatedModelError("Simulated 429 Resource has been exhausted")
+        duration = self.latency
+        if self.tokens_per_second > 0:
+            duration += self.response_tokens / self.tokens_per_second
+        return duration
+
+    def _finish(self, prompt: str) -> LocalResponse:
+        text = self._respond(prompt)
+        with self._lock:
+            self.response_chars += len(text)
+        return LocalResponse(text)
+
+    def generate_content(self, prompt: str) -> LocalResponse:
+        time.sleep(self._account(prompt))
+        return self._finish(prompt)
+
+    async def generate_content_async(self, prompt: str) -> LocalResponse:
+        await asyncio.sleep(self._account(prompt))
+        return self._finish(prompt)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "prompt_tokens": self.prompt_chars // CHARS_PER_TOKEN,
+            "response_tokens": self.response_chars // CHARS_PER_TOKEN
+        }
+
+
+def _create_gemini_model() -> Any:
+    import google.generativeai as genai
+
+    # Configure Gemini API using environment variable
+    api_key = os.getenv('GEMINI_API_KEY')
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in environment variables. Please set it in your .env file.")
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+
+_model: Optional[Any] = None
+_model_lock = threading.Lock()
+
+
+def get_model() -> Any:
+    """The shared model instance for MODEL_BACKEND, created on first use."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            if MODEL_BACKEND == 'local':
+                _model = LocalModel()
+            elif MODEL_BACKEND == 'gemini':
+                _model = _create_gemini_model()
+            else:
+                raise ValueError(f"Unknown MODEL_BACKEND '{MODEL_BACKEND}'. Use 'gemini' or 'local'.")
+        return _model
+
+
+def set_model(model: Optional[Any]) -> None:
+    """Replace the shared model (e.g. with a configured LocalModel); None resets it."""
+    global _model
+    with _model_lock:
+        _model = model
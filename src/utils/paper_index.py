@@ -0,0 +1,189 @@
+"""
+Local metadata index of arXiv papers seen by the server.
+One SQLite row per paper (ID without version, latest version seen, title,
+authors, categories, PDF URL and local PDF path), so repeat ID lookups and
+exact title matching are served without querying arXiv.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+PAPER_INDEX_ENABLED = os.getenv('PAPER_INDEX_ENABLED', '1') != '0'
+PAPER_INDEX_PATH = os.getenv('PAPER_INDEX_PATH', './pdfs/papers.sqlite3')
+# How long an unversioned ID lookup may be answered locally before re-checking arXiv for a newer version
+PAPER_INDEX_TTL_SECONDS = float(os.getenv('PAPER_INDEX_TTL_SECONDS', str(7 * 24 * 3600)))
+
+_ARXIV_ID = re.compile(
+    r'^(?:arxiv:|https?://arxiv\.org/(?:abs|pdf)/)?'
+    r'(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v(\d+))?(?:\.pdf)?$',
+    re.IGNORECASE
+)
+
+
+def parse_arxiv_id(text: str) -> Optional[Tuple[str, Optional[int]]]:
+    """
+    Split an arXiv identifier (optionally prefixed with arXiv: or an abs/pdf URL)
+    into (base id, version); None if the text isn't an identifier.
+    """
+    match = _ARXIV_ID.match(text.strip())
+    if not match:
+        return None
+    version = match.group(2)
+    return match.group(1), int(version) if version else None
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(title.lower().split())
+
+
+class PaperIndex:
+    """SQLite-backed paper metadata keyed by versionless arXiv ID."""
+
+    def __init__(self, path: str = PAPER_INDEX_PATH, ttl_seconds: float = PAPER_INDEX_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS papers (
+                arxiv_id TEXT PRIMARY KEY,
+                version INTEGER,
+                title TEXT NOT NULL,
+                title_norm TEXT NOT NULL,
+                authors TEXT NOT NULL,
+                categories TEXT NOT NULL,
+                pdf_url TEXT NOT NULL,
+                pdf_path TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS papers_title ON papers (title_norm)")
+        self._conn.commit()
+
+    @staticmethod
+    def _to_paper(row: sqlite3.Row) -> Dict[str, Any]:
+        version = row["version"]
+        return {
+            "arxiv_id": f"{row['arxiv_id']}v{version}" if version else row["arxiv_id"],
+            "title": row["title"],
+            "authors": row["authors"],
+            "categories": json.loads(row["categories"]),
+            "pdf_url": row["pdf_url"],
+            "local_pdf_path": row["pdf_path"]
+        }
+
+    def _count(self, found: bool) -> None:
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def upsert(self, paper: Dict[str, Any]) -> None:
+        """Record a paper's metadata, keeping the newest version and any known PDF path."""
+        parsed = parse_arxiv_id(paper["arxiv_id"])
+        if parsed is None:
+            return
+        base_id, version = parsed
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO papers (arxiv_id, version, title, title_norm, authors, categories, pdf_url, pdf_path, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (arxiv_id) DO UPDATE SET
+                    version=excluded.version, title=excluded.title, title_norm=excluded.title_norm,
+                    authors=excluded.authors, categories=excluded.categories, pdf_url=excluded.pdf_url,
+                    pdf_path=COALESCE(excluded.pdf_path, papers.pdf_path), updated_at=excluded.updated_at
+                WHERE COALESCE(excluded.version, 0) >= COALESCE(papers.version, 0)
+                """,
+                (
+                    base_id, version, paper["title"], normalize_title(paper["title"]), paper.get("authors", ""),
+                    json.dumps(paper.get("categories", [])), paper["pdf_url"], paper.get("local_pdf_path"),
+                    time.time()
+                )
+            )
+            self._conn.commit()
+
+    def set_pdf_path(self, arxiv_id: str, pdf_path: str) -> None:
+        parsed = parse_arxiv_id(arxiv_id)
+        if parsed is None:
+            return
+        with self._lock:
+            self._conn.execute("UPDATE papers SET pdf_path=? WHERE arxiv_id=?", (pdf_path, parsed[0]))
+            self._conn.commit()
+
+    def get(self, arxiv_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Paper for an ID. A versioned ID only matches that exact version; an
+        unversioned one matches the latest version seen, if refreshed within the TTL.
+        """
+        parsed = parse_arxiv_id(arxiv_id)
+        if parsed is None:
+            return None
+        base_id, version = parsed
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM papers WHERE arxiv_id=?", (base_id,)).fetchone()
+            if row is not None and version is not None:
+                found = row["version"] == version
+            elif row is not None:
+                found = self.ttl_seconds <= 0 or time.time() - row["updated_at"] <= self.ttl_seconds
+            else:
+                found = False
+            self._count(found)
+        return self._to_paper(row) if found else None
+
+    def find_by_title(self, title: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Papers whose title matches exactly, ignoring case and whitespace."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM papers WHERE title_norm=? ORDER BY updated_at DESC LIMIT ?",
+                (normalize_title(title), limit)
+            ).fetchall()
+            self._count(bool(rows))
+        return [self._to_paper(row) for row in rows]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM papers")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            papers, with_pdf = self._conn.execute(
+                "SELECT COUNT(*), COUNT(pdf_path) FROM papers"
+            ).fetchone()
+        return {
+            "path": self.path,
+            "papers": papers,
+            "with_pdf": with_pdf,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+_index: Optional[PaperIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_paper_index() -> Optional[PaperIndex]:
+    """Shared index instance, or None when PAPER_INDEX_ENABLED=0."""
+    global _index
+    if not PAPER_INDEX_ENABLED:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = PaperIndex()
+        return _index
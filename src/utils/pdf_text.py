@@ -0,0 +1,390 @@
+"""
+Lazy PDF text extraction.
+The PDF is memory-mapped instead of copied into a BytesIO, and pages are
+parsed one at a time so extraction stops as soon as the character budget is
+reached. Extracted text is cached in a gzip sidecar next to the PDF; a file
+lock per PDF keeps processes sharing ./pdfs from parsing it concurrently.
+Parsing can run on a process pool so CPU-bound pypdf work doesn't block the
+server process. pypdf is imported on first extraction, not at server startup.
+"""
+
+import gzip
+import hashlib
+import itertools
+import json
+import mmap
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from src.utils.file_lock import cache_lock
+
+
+# Prompts take budgeted sections of this text (src/utils/chunking.py), so extract well past the first pages
+MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', '30'))
+MAX_CHARS = int(os.getenv('PDF_MAX_CHARS', '120000'))
+
+PDF_TEXT_CACHE_ENABLED = os.getenv('PDF_TEXT_CACHE_ENABLED', '1') != '0'
+# Bump whenever extraction output changes for the same inputs; older sidecars
+# are then treated as stale and rewritten on next use.
+EXTRACTOR_VERSION = 1
+
+# Process pool settings; PDF_EXTRACT_WORKERS=0 parses inline in the caller
+PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Seconds a task may run; PDF_EXTRACT_QUEUE_TIMEOUT bounds how long it may wait for a free worker
+PDF_EXTRACT_TIMEOUT = float(os.getenv('PDF_EXTRACT_TIMEOUT', '60'))
+PDF_EXTRACT_QUEUE_TIMEOUT = float(os.getenv('PDF_EXTRACT_QUEUE_TIMEOUT', '600'))
+PDF_EXTRACT_PAGES_PER_TASK = int(os.getenv('PDF_EXTRACT_PAGES_PER_TASK', '5'))
+PDF_EXTRACT_MAX_TASKS_PER_CHILD = int(os.getenv('PDF_EXTRACT_MAX_TASKS_PER_CHILD', '50'))
+
+
+def iter_pdf_pages(local_path: str, max_pages: int = MAX_PAGES, start_page: int = 0) -> Iterator[str]:
+    """Yield the text of each page in turn, from start_page up to max_pages."""
+    from pypdf import PdfReader
+
+    with open(local_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            reader = PdfReader(mapped)
+            for page_number in range(start_page, min(max_pages, len(reader.pages))):
+                yield reader.pages[page_number].extract_text() or ""
+
+
+def count_pdf_pages(local_path: str) -> int:
+    from pypdf import PdfReader
+
+    with open(local_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return len(PdfReader(mapped).pages)
+
+
+def extract_page_range(local_path: str, start_page: int, end_page: int, max_chars: int = MAX_CHARS) -> str:
+    """Text of pages [start_page, end_page), stopping early once max_chars is reached."""
+    parts = []
+    length = 0
+    pages = iter_pdf_pages(local_path, end_page, start_page)
+    try:
+        for page_text in pages:
+            parts.append(page_text)
+            length += len(page_text)
+            if length >= max_chars:
+                break
+    finally:
+        pages.close()
+    return "".join(parts)
+
+
+def extract_text(local_path: str, max_pages: int = MAX_PAGES, max_chars: int = MAX_CHARS) -> str:
+    """Concatenate page text until max_chars is reached, without parsing later pages."""
+    return extract_page_range(local_path, 0, max_pages, max_chars)[:max_chars]
+
+
+class ExtractionStuck(Exception):
+    """A pool task ran (or sat queued) past its limit; pid is the worker running it, if it started."""
+
+    def __init__(self, pid: Optional[int]):
+        super().__init__(pid)
+        self.pid = pid
+
+
+# Set in pool workers: where tasks report (task id, pid, start time) when they begin running
+_started_queue: Any = None
+
+
+def _init_worker(started: Any) -> None:
+    global _started_queue
+    _started_queue = started
+
+
+def _run_task(task_id: int, func: Callable[..., Any], *args: Any) -> Any:
+    _started_queue.put((task_id, os.getpid(), time.monotonic()))
+    return func(*args)
+
+
+class PdfExtractionPool:
+    """
+    Process pool for pypdf parsing.
+    The pool is recycled after max_tasks_per_child tasks per worker (a fresh
+    executor takes new work while the old one drains). Each task reports when
+    it starts running, and the timeout counts from then, so time spent queued
+    behind other PDFs doesn't count. A task that runs past the timeout retires
+    its executor: new work goes to a fresh one, other extractions already on
+    the old one finish, and then its workers (the stuck one included) are killed.
+    """
+
+    def __init__(
+        self,
+        workers: int = PDF_EXTRACT_WORKERS,
+        timeout: float = PDF_EXTRACT_TIMEOUT,
+        pages_per_task: int = PDF_EXTRACT_PAGES_PER_TASK,
+        max_tasks_per_child: int = PDF_EXTRACT_MAX_TASKS_PER_CHILD,
+        queue_timeout: float = PDF_EXTRACT_QUEUE_TIMEOUT
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self.pages_per_task = max(1, pages_per_task)
+        self.max_tasks_per_child = max_tasks_per_child
+        self.queue_timeout = queue_timeout
+        self.timeouts = 0
+        self._tasks = 0
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Not fork: forked workers would inherit the flock()ed cache lock files held
+        # by other threads at that moment and keep those locks alive after release
+        self._context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        )
+        self._started = self._context.SimpleQueue()
+        # task id -> (worker pid, monotonic start time), for tasks currently running
+        self._running: Dict[int, Tuple[int, float]] = {}
+        # Unfinished task ids per executor, so a retired executor is only torn down once they are done
+        self._pending: Dict[ProcessPoolExecutor, Set[int]] = {}
+
+    def _get_executor(self, tasks: int = 1) -> ProcessPoolExecutor:
+        """
+        Current executor, counting tasks about to be submitted to it.
+        ProcessPoolExecutor's own max_tasks_per_child isn't used: on Python
+        3.11/3.12 a worker exiting with tasks still queued can stall the pool.
+        """
+        with self._lock:
+            if self.max_tasks_per_child > 0 and self._tasks >= self.max_tasks_per_child * self.workers:
+                # Dropped, not shut down: extractions still holding it can keep
+                # submitting, and its workers exit once it is unreferenced and idle
+                self._executor = None
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=self._context,
+                    initializer=_init_worker,
+                    initargs=(self._started,)
+                )
+                self._tasks = 0
+            self._tasks += tasks
+            return self._executor
+
+    def _submit(self, executor: ProcessPoolExecutor, func: Callable[..., Any], *args: Any) -> Tuple[int, Future]:
+        task_id = next(self._task_ids)
+        with self._lock:
+            self._pending.setdefault(executor, set()).add(task_id)
+        future = executor.submit(_run_task, task_id, func, *args)
+        future.add_done_callback(lambda _: self._finished(executor, task_id))
+        return task_id, future
+
+    def _finished(self, executor: ProcessPoolExecutor, task_id: int) -> None:
+        with self._lock:
+            self._pending.get(executor, set()).discard(task_id)
+            self._running.pop(task_id, None)
+
+    def _drain_started(self) -> None:
+        with self._lock:
+            while not self._started.empty():
+                task_id, pid, started_at = self._started.get()
+                if task_id in set().union(*self._pending.values()):
+                    self._running[task_id] = (pid, started_at)
+
+    def _wait(self, task_id: int, future: Future, submitted_at: float) -> Any:
+        """Result of a task, raising ExtractionStuck once it has run for longer than the timeout."""
+        while True:
+            try:
+                return future.result(timeout=0.5)
+            except FutureTimeoutError:
+                pass
+            self._drain_started()
+            now = time.monotonic()
+            running = self._running.get(task_id)
+            if running is not None and now - running[1] > self.timeout:
+                raise ExtractionStuck(running[0])
+            if running is None and now - submitted_at > self.queue_timeout:
+                raise ExtractionStuck(None)
+
+    def _retire(self, executor: ProcessPoolExecutor, abandoned: List[int]) -> None:
+        """Stop sending work to an executor with a stuck worker, and kill its workers once its other tasks are done."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+            pending = self._pending.get(executor, set())
+            pending.difference_update(abandoned)
+            for task_id in abandoned:
+                self._running.pop(task_id, None)
+
+        def reap() -> None:
+            deadline = time.monotonic() + self.queue_timeout
+            while time.monotonic() < deadline:
+                with self._lock:
+                    if not self._pending.get(executor):
+                        break
+                time.sleep(0.5)
+            with self._lock:
+                self._pending.pop(executor, None)
+            for process in list((executor._processes or {}).values()):
+                process.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        threading.Thread(target=reap, name="pdf-pool-reaper", daemon=True).start()
+
+    def extract(self, local_path: str, max_pages: int = MAX_PAGES, max_chars: int = MAX_CHARS) -> str:
+        """
+        Extract text on the pool. PDFs longer than pages_per_task are split into
+        page ranges parsed in parallel; ranges are joined in order and trimmed to
+        max_chars. Raises TimeoutError if a part of the PDF runs longer than the timeout.
+        """
+        executor = self._get_executor(1 + -(-max_pages // self.pages_per_task))
+        submitted_at = time.monotonic()
+        tasks: List[Tuple[int, Future]] = []
+        try:
+            tasks.append(self._submit(executor, count_pdf_pages, local_path))
+            page_count = min(max_pages, self._wait(*tasks[0], submitted_at))
+            ranges = [
+                self._submit(
+                    executor,
+                    extract_page_range,
+                    local_path,
+                    start,
+                    min(start + self.pages_per_task, page_count),
+                    max_chars
+                )
+                for start in range(0, page_count, self.pages_per_task)
+            ]
+            tasks.extend(ranges)
+            submitted_at = time.monotonic()
+            parts: List[str] = []
+            length = 0
+            for task_id, future in ranges:
+                text = self._wait(task_id, future, submitted_at)
+                parts.append(text)
+                length += len(text)
+                if length >= max_chars:
+                    break
+            for _, future in ranges:
+                future.cancel()
+            return "".join(parts)[:max_chars]
+        except ExtractionStuck as e:
+            self.timeouts += 1
+            for _, future in tasks:
+                future.cancel()
+            self._retire(executor, [task_id for task_id, _ in tasks])
+            if e.pid is None:
+                raise TimeoutError(f"PDF extraction waited over {self.queue_timeout}s for a worker: {local_path}")
+            raise TimeoutError(f"PDF extraction timed out after {self.timeout}s: {local_path}")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pool: Optional[PdfExtractionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> Optional[PdfExtractionPool]:
+    """Shared extraction pool, or None when PDF_EXTRACT_WORKERS=0."""
+    global _pool
+    if PDF_EXTRACT_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = PdfExtractionPool()
+        return _pool
+
+
+def extract_text_pooled(local_path: str, max_pages: int = MAX_PAGES, max_chars: int = MAX_CHARS) -> str:
+    """extract_text on the shared process pool, falling back to inline parsing."""
+    pool = get_extraction_pool()
+    if pool is None:
+        return extract_text(local_path, max_pages, max_chars)
+    return pool.extract(local_path, max_pages, max_chars)
+
+
+def _sidecar_path(local_path: str) -> str:
+    return local_path + '.txt.gz'
+
+
+def _pdf_sha256(local_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(local_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_sidecar(local_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with gzip.open(_sidecar_path(local_path), 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError, EOFError):
+        return None
+
+
+def _write_sidecar(local_path: str, entry: Dict[str, Any]) -> None:
+    directory = os.path.dirname(os.path.abspath(local_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, _sidecar_path(local_path))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def read_cached_text(local_path: str) -> Optional[str]:
+    """Text in the PDF's sidecar, whatever settings extracted it; None if there is none."""
+    entry = _read_sidecar(local_path)
+    return entry.get("text") if entry is not None else None
+
+
+def _sidecar_text(local_path: str, params: Dict[str, Any]) -> Optional[str]:
+    """Cached text if the sidecar matches params and the PDF's current content."""
+    stat = os.stat(local_path)
+    entry = _read_sidecar(local_path)
+    if entry is not None and all(entry.get(k) == v for k, v in params.items()):
+        if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry["text"]
+        if entry.get("sha256") == _pdf_sha256(local_path):
+            # Same content, touched file: refresh the stat fields only
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            _write_sidecar(local_path, entry)
+            return entry["text"]
+    return None
+
+
+def text_lock_key(local_path: str) -> str:
+    """Cache lock key for extracting a PDF's text."""
+    return f"text:{os.path.abspath(local_path)}"
+
+
+def extract_text_cached(local_path: str, max_pages: int = MAX_PAGES, max_chars: int = MAX_CHARS) -> str:
+    """
+    extract_text with a sidecar cache at <pdf>.txt.gz.
+    The sidecar is reused only when the PDF checksum, max_pages, max_chars and
+    EXTRACTOR_VERSION all match; otherwise the PDF is re-parsed and the sidecar
+    replaced. The checksum is only recomputed when size or mtime changed.
+    """
+    if not PDF_TEXT_CACHE_ENABLED:
+        return extract_text_pooled(local_path, max_pages, max_chars)
+
+    params = {"max_pages": max_pages, "max_chars": max_chars, "extractor_version": EXTRACTOR_VERSION}
+    text = _sidecar_text(local_path, params)
+    if text is not None:
+        return text
+    with cache_lock(text_lock_key(local_path)) as waited:
+        if waited:
+            text = _sidecar_text(local_path, params)
+            if text is not None:
+                return text
+        stat = os.stat(local_path)
+        text = extract_text_pooled(local_path, max_pages, max_chars)
+        _write_sidecar(local_path, dict(
+            params,
+            sha256=_pdf_sha256(local_path),
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            text=text
+        ))
+    return text
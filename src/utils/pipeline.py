@@ -0,0 +1,111 @@
+"""
+Staged pipeline used to overlap per-paper work across papers.
+Each stage has its own bounded input queue and worker threads, so paper N+1
+can be downloading while paper N is being extracted or summarized.
+"""
+
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional
+
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """A pipeline stage: func is applied to every item passing through."""
+    name: str
+    func: Callable[[Any], Any]
+    concurrency: int = 1
+    queue_size: int = 4
+
+
+def run_pipeline(
+    items: Iterable[Any],
+    stages: List[Stage],
+    on_output: Optional[Callable[[int, Any], None]] = None
+) -> List[Any]:
+    """
+    Push items through the stages and return the final outputs in input order.
+    The input iterable is consumed on its own thread, so a slow producer
+    (e.g. paging through search results) overlaps with the stages as well.
+    on_output(index, output) is called on the caller's thread as each item
+    finishes, in completion order, so results can be delivered before the batch is done.
+    If a stage raises, the pipeline drains and the first error is re-raised.
+    """
+    queues: List[queue.Queue] = [queue.Queue(maxsize=max(1, s.queue_size)) for s in stages]
+    output: queue.Queue = queue.Queue()
+    errors: List[BaseException] = []
+    threads: List[threading.Thread] = []
+
+    def feed() -> None:
+        try:
+            for index, item in enumerate(items):
+                queues[0].put((index, item))
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            queues[0].put(_DONE)
+
+    def make_worker(position: int, stage: Stage, remaining: List[int], lock: threading.Lock) -> Callable[[], None]:
+        inbox = queues[position]
+        outbox = queues[position + 1] if position + 1 < len(stages) else output
+
+        def work() -> None:
+            while True:
+                entry = inbox.get()
+                if entry is _DONE:
+                    with lock:
+                        remaining[0] -= 1
+                        last = remaining[0] == 0
+                    # The last worker of a stage closes the next stage;
+                    # the others hand the sentinel on to their siblings
+                    if last:
+                        outbox.put(_DONE)
+                    else:
+                        inbox.put(_DONE)
+                    return
+                index, item = entry
+                if errors:
+                    continue
+                try:
+                    outbox.put((index, stage.func(item)))
+                except BaseException as e:
+                    errors.append(e)
+
+        return work
+
+    for position, stage in enumerate(stages):
+        workers = max(1, stage.concurrency)
+        remaining, lock = [workers], threading.Lock()
+        for n in range(workers):
+            threads.append(threading.Thread(
+                target=make_worker(position, stage, remaining, lock),
+                name=f"pipeline-{stage.name}-{n}",
+                daemon=True
+            ))
+    threads.append(threading.Thread(target=feed, name="pipeline-feed", daemon=True))
+
+    for thread in threads:
+        thread.start()
+
+    results: List[tuple] = []
+    while True:
+        entry = output.get()
+        if entry is _DONE:
+            break
+        results.append(entry)
+        if on_output is not None and not errors:
+            try:
+                on_output(*entry)
+            except BaseException as e:
+                errors.append(e)
+
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return [item for _, item in sorted(results, key=lambda entry: entry[0])]
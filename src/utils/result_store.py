@@ -0,0 +1,88 @@
+"""
+Full per-paper results, kept so tools can return compact payloads.
+Every summarized paper is stored here in full (templates, analyses,
+summaries); the tools return only the detail level the client asked for and
+the heavy fields stay retrievable by arXiv ID through the paper:// resource.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.utils.paper_index import parse_arxiv_id
+
+
+RESULT_STORE_PATH = os.getenv('RESULT_STORE_PATH', './pdfs/results.sqlite3')
+
+
+class ResultStore:
+    """SQLite-backed latest result per paper version."""
+
+    def __init__(self, path: str = RESULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS paper_results (
+                arxiv_id TEXT PRIMARY KEY,
+                base_id TEXT NOT NULL,
+                result TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS paper_results_base ON paper_results (base_id, updated_at)")
+        self._conn.commit()
+
+    def put(self, result: Dict[str, Any]) -> None:
+        arxiv_id = result["arxiv_id"]
+        parsed = parse_arxiv_id(arxiv_id)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO paper_results VALUES (?, ?, ?, ?)",
+                (arxiv_id, parsed[0] if parsed else arxiv_id, json.dumps(result), time.time())
+            )
+            self._conn.commit()
+
+    def get(self, arxiv_id: str) -> Optional[Dict[str, Any]]:
+        """Result for an exact ID, or the most recent version for an unversioned one."""
+        parsed = parse_arxiv_id(arxiv_id)
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM paper_results WHERE arxiv_id=?", (arxiv_id,)).fetchone()
+            if row is None and parsed is not None and parsed[1] is None:
+                row = self._conn.execute(
+                    "SELECT result FROM paper_results WHERE base_id=? ORDER BY updated_at DESC LIMIT 1",
+                    (parsed[0],)
+                ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT arxiv_id FROM paper_results")]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            papers, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(result)), 0) FROM paper_results"
+            ).fetchone()
+        return {"path": self.path, "papers": papers, "bytes": size}
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """Shared store instance for this process."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore()
+        return _store
@@ -0,0 +1,259 @@
+"""
+Shared scheduler for model calls.
+Applies token-bucket rate limiting against a requests-per-minute and
+tokens-per-minute budget (shrinking the rate when the API throttles us and
+recovering gradually), retries retryable errors with jittered exponential
+backoff, and coalesces identical in-flight requests so concurrent duplicates
+share one call.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from src.utils.metrics import metrics
+
+
+# 0 disables the corresponding budget
+LLM_QPM = float(os.getenv('LLM_QPM', '0'))
+LLM_TPM = float(os.getenv('LLM_TPM', '0'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '4'))
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', '1.0'))
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', '30'))
+# Output tokens reserved per call on top of the prompt estimate, for the TPM budget
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv('LLM_EXPECTED_OUTPUT_TOKENS', '800'))
+
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """429s, timeouts and transient server errors, from google.api_core or any error carrying a code."""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(exc, 'code', None)
+    try:
+        return int(code) in RETRYABLE_CODES
+    except (TypeError, ValueError):
+        return False
+
+
+def is_throttle(exc: BaseException) -> bool:
+    try:
+        return int(getattr(exc, 'code', None)) == 429
+    except (TypeError, ValueError):
+        return False
+
+
+def estimate_tokens(prompt: str) -> int:
+    return len(prompt) // 4 + LLM_EXPECTED_OUTPUT_TOKENS
+
+
+class TokenBucket:
+    """
+    Per-minute budget refilled continuously. reserve() debits immediately and
+    returns how long the caller must wait, so sync and async callers share it.
+    The refill rate is scaled down on throttling and recovers on success.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.scale = 1.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            rate = self.capacity / 60.0 * self.scale
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / rate
+
+    def throttled(self) -> None:
+        with self._lock:
+            self.scale = max(0.1, self.scale * 0.5)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.scale = min(1.0, self.scale + 0.05)
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        qpm: float = LLM_QPM,
+        tpm: float = LLM_TPM,
+        max_retries: int = LLM_MAX_RETRIES,
+        base_delay: float = LLM_RETRY_BASE_DELAY,
+        max_delay: float = LLM_RETRY_MAX_DELAY
+    ):
+        self.requests = TokenBucket(qpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._inflight_async: Dict[Hashable, asyncio.Future] = {}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "qpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "rate_scale": round(min(self.requests.scale, self.tokens.scale), 3),
+            "inflight": len(self._inflight) + len(self._inflight_async)
+        }
+
+    def _admission_delay(self, tokens: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _on_error(self, exc: BaseException, attempt: int, stage: str) -> Optional[float]:
+        """Return the retry delay, or None if the error should propagate."""
+        if is_throttle(exc):
+            self.requests.throttled()
+            self.tokens.throttled()
+            metrics.inc("llm_throttled_total", stage=stage)
+        if attempt >= self.max_retries or not is_retryable(exc):
+            return None
+        metrics.inc("llm_retries_total", stage=stage)
+        return self._backoff(attempt)
+
+    def _on_success(self) -> None:
+        self.requests.succeeded()
+        self.tokens.succeeded()
+
+    def _run(self, fn: Callable[[], Any], tokens: int, stage: str) -> Any:
+        attempt = 0
+        while True:
+            delay = self._admission_delay(tokens)
+            if delay > 0:
+                metrics.observe("llm_rate_limit_wait_seconds", delay, stage=stage)
+                time.sleep(delay)
+            try:
+                result = fn()
+                self._on_success()
+                return result
+            except Exception as e:
+                retry_delay = self._on_error(e, attempt, stage)
+                if retry_delay is None:
+                    raise
+                time.sleep(retry_delay)
+                attempt += 1
+
+    def coalesce(self, key: Hashable, fn: Callable[[], Any], stage: str = "llm") -> Tuple[Any, bool]:
+        """
+        Run fn, unless a call with the same key is already running: then wait
+        for it and share its result (or error). Returns (result, shared).
+        """
+        with self._lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = Future()
+        if not owner:
+            metrics.inc("llm_coalesced_total", stage=stage)
+            return pending.result(), True
+
+        try:
+            result = fn()
+            pending.set_result(result)
+            return result, False
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def call(self, key: Optional[Hashable], fn: Callable[[], Any], tokens: int, stage: str = "llm") -> Any:
+        """
+        Run fn under the rate limits with retries. Concurrent calls with the same
+        key wait for the first one and share its result (or error); a None key
+        skips coalescing, for callers that already coalesce around more work.
+        """
+        if key is None:
+            return self._run(fn, tokens, stage)
+        return self.coalesce(key, lambda: self._run(fn, tokens, stage), stage)[0]
+
+    async def _run_async(self, fn: Callable[[], Awaitable[Any]], tokens: int, stage: str) -> Any:
+        attempt = 0
+        while True:
+            delay = self._admission_delay(tokens)
+            if delay > 0:
+                metrics.observe("llm_rate_limit_wait_seconds", delay, stage=stage)
+                await asyncio.sleep(delay)
+            try:
+                result = await fn()
+                self._on_success()
+                return result
+            except Exception as e:
+                retry_delay = self._on_error(e, attempt, stage)
+                if retry_delay is None:
+                    raise
+                await asyncio.sleep(retry_delay)
+                attempt += 1
+
+    async def coalesce_async(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        stage: str = "llm"
+    ) -> Tuple[Any, bool]:
+        """Async counterpart of coalesce; coalescing is per event loop."""
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        pending = self._inflight_async.get(loop_key)
+        if pending is not None:
+            metrics.inc("llm_coalesced_total", stage=stage)
+            return await asyncio.shield(pending), True
+
+        pending = self._inflight_async[loop_key] = loop.create_future()
+        try:
+            result = await fn()
+            pending.set_result(result)
+            return result, False
+        except BaseException as e:
+            pending.set_exception(e)
+            # Mark retrieved so an error with no waiters isn't reported as unhandled
+            pending.exception()
+            raise
+        finally:
+            self._inflight_async.pop(loop_key, None)
+
+    async def call_async(
+        self,
+        key: Optional[Hashable],
+        fn: Callable[[], Awaitable[Any]],
+        tokens: int,
+        stage: str = "llm"
+    ) -> Any:
+        """Async counterpart of call."""
+        if key is None:
+            return await self._run_async(fn, tokens, stage)
+        return (await self.coalesce_async(key, lambda: self._run_async(fn, tokens, stage), stage))[0]
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """Process-wide scheduler shared by every model call."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
@@ -0,0 +1,234 @@
+"""
+Local full-text search over summarized papers.
+Every stored result is indexed with its title, summaries and the extracted
+text from the PDF's sidecar cache: a BM25 inverted index in SQLite, plus a
+hashed bag-of-words vector per paper. Queries are ranked by BM25 and, when
+NumPy is installed, blended with the cosine similarity of the hashed vectors
+(computed in one matrix product), so "which papers have we already processed
+that discuss X" needs no arXiv or model call.
+"""
+
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.template_store import STOPWORDS
+
+
+SEARCH_INDEX_ENABLED = os.getenv('SEARCH_INDEX_ENABLED', '1') != '0'
+SEARCH_INDEX_PATH = os.getenv('SEARCH_INDEX_PATH', './pdfs/search.sqlite3')
+# Dimensions of the hashed term vectors; 0 disables vector similarity
+SEARCH_VECTOR_DIM = int(os.getenv('SEARCH_VECTOR_DIM', '2048'))
+# Share of the final score from vector similarity, the rest from normalized BM25
+SEARCH_VECTOR_WEIGHT = float(os.getenv('SEARCH_VECTOR_WEIGHT', '0.3'))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Term frequency multipliers per field
+FIELD_WEIGHTS = {"title": 3, "summary": 2, "text": 1}
+SUMMARY_FIELDS = ("executive_summary", "focused_summary", "holistic_summary", "template_selection_reasoning")
+
+_TOKEN = re.compile(r'[a-z0-9]{2,}')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords, plural "s" stripped."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _slot(term: str, dim: int) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'big') % dim
+
+
+def hashed_vector(counts: Dict[str, float], dim: int = SEARCH_VECTOR_DIM) -> array:
+    """
+    L2-normalized hashing of log-scaled term counts, as float32. Unsigned, so
+    colliding terms can only add similarity, never cancel a query term out.
+    """
+    vector = array('f', bytes(4 * dim))
+    for term, count in counts.items():
+        vector[_slot(term, dim)] += 1.0 + math.log(count)
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm:
+        for index in range(dim):
+            vector[index] /= norm
+    return vector
+
+
+def paper_fields(result: Dict[str, Any], text: str) -> Dict[str, str]:
+    return {
+        "title": result.get("title", ""),
+        "summary": "\n".join(str(result.get(field) or "") for field in SUMMARY_FIELDS),
+        "text": text
+    }
+
+
+class SearchIndex:
+    """SQLite-backed BM25 index with hashed term vectors, shared by processes using ./pdfs."""
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH, vector_dim: int = SEARCH_VECTOR_DIM):
+        self.path = path
+        self.vector_dim = vector_dim
+        self.queries = 0
+        self._lock = threading.Lock()
+        # (document count, latest update) -> loaded lengths and vector matrix
+        self._snapshot: Optional[Tuple[Tuple[int, float], Dict[str, int], List[str], Any]] = None
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS search_docs (
+                arxiv_id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                vector BLOB,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS search_postings (
+                term TEXT NOT NULL,
+                arxiv_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, arxiv_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS search_postings_doc ON search_postings (arxiv_id);
+            """
+        )
+        self._conn.commit()
+
+    def add(self, result: Dict[str, Any], text: str) -> None:
+        """Index (or re-index) a summarized paper."""
+        counts: Counter = Counter()
+        for field, value in paper_fields(result, text).items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(value):
+                counts[token] += weight
+        vector = hashed_vector(counts, self.vector_dim).tobytes() if self.vector_dim > 0 else None
+        arxiv_id = result["arxiv_id"]
+        with self._lock:
+            self._conn.execute("DELETE FROM search_postings WHERE arxiv_id=?", (arxiv_id,))
+            self._conn.executemany(
+                "INSERT INTO search_postings VALUES (?, ?, ?)",
+                [(term, arxiv_id, tf) for term, tf in counts.items()]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_docs VALUES (?, ?, ?, ?, ?)",
+                (arxiv_id, result.get("title", ""), sum(counts.values()), vector, time.time())
+            )
+            self._conn.commit()
+
+    def indexed_ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT arxiv_id FROM search_docs")]
+
+    def _load(self) -> Tuple[Dict[str, int], List[str], Any]:
+        """Document lengths and the vector matrix, reloaded only after the index changed."""
+        version = self._conn.execute("SELECT COUNT(*), COALESCE(MAX(updated_at), 0) FROM search_docs").fetchone()
+        if self._snapshot is not None and self._snapshot[0] == tuple(version):
+            return self._snapshot[1:]
+        rows = self._conn.execute("SELECT arxiv_id, length, vector FROM search_docs ORDER BY arxiv_id").fetchall()
+        lengths = {arxiv_id: length for arxiv_id, length, _ in rows}
+        ids: List[str] = []
+        matrix = None
+        if self.vector_dim > 0:
+            try:
+                import numpy as np
+            except ImportError:
+                np = None
+            if np is not None:
+                ids = [arxiv_id for arxiv_id, _, vector in rows if vector and len(vector) == 4 * self.vector_dim]
+                blobs = b"".join(vector for _, _, vector in rows if vector and len(vector) == 4 * self.vector_dim)
+                matrix = np.frombuffer(blobs, dtype=np.float32).reshape(len(ids), self.vector_dim)
+        self._snapshot = (tuple(version), lengths, ids, matrix)
+        return lengths, ids, matrix
+
+    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Papers ranked for the query: arxiv_id, score, bm25 and (with NumPy) similarity."""
+        terms = Counter(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            self.queries += 1
+            lengths, ids, matrix = self._load()
+            postings = {
+                term: self._conn.execute(
+                    "SELECT arxiv_id, tf FROM search_postings WHERE term=?", (term,)
+                ).fetchall()
+                for term in terms
+            }
+        if not lengths:
+            return []
+
+        total = len(lengths)
+        average = sum(lengths.values()) / total or 1.0
+        bm25: Dict[str, float] = Counter()
+        for term, rows in postings.items():
+            idf = math.log(1 + (total - len(rows) + 0.5) / (len(rows) + 0.5))
+            for arxiv_id, tf in rows:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths.get(arxiv_id, average) / average)
+                bm25[arxiv_id] += terms[term] * idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        similarity: Dict[str, float] = {}
+        if matrix is not None and len(ids):
+            import numpy as np
+
+            query_vector = np.frombuffer(hashed_vector(terms, self.vector_dim).tobytes(), dtype=np.float32)
+            scores = matrix @ query_vector
+            for position in np.argsort(-scores)[:limit * 4]:
+                if scores[position] > 0:
+                    similarity[ids[position]] = float(scores[position])
+
+        best = max(bm25.values(), default=0.0) or 1.0
+        weight = SEARCH_VECTOR_WEIGHT if similarity else 0.0
+        ranked = []
+        for arxiv_id in set(bm25) | set(similarity):
+            score = (1 - weight) * bm25.get(arxiv_id, 0.0) / best + weight * similarity.get(arxiv_id, 0.0)
+            entry = {"arxiv_id": arxiv_id, "score": round(score, 4), "bm25": round(bm25.get(arxiv_id, 0.0), 4)}
+            if similarity:
+                entry["similarity"] = round(similarity.get(arxiv_id, 0.0), 4)
+            ranked.append(entry)
+        ranked.sort(key=lambda entry: (-entry["score"], entry["arxiv_id"]))
+        return ranked[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM search_postings")
+            self._conn.execute("DELETE FROM search_docs")
+            self._conn.commit()
+            self._snapshot = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            papers = self._conn.execute("SELECT COUNT(*) FROM search_docs").fetchone()[0]
+            terms = self._conn.execute("SELECT COUNT(DISTINCT term) FROM search_postings").fetchone()[0]
+        return {"path": self.path, "papers": papers, "terms": terms, "queries": self.queries}
+
+
+_index: Optional[SearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> Optional[SearchIndex]:
+    """Shared index instance, or None when SEARCH_INDEX_ENABLED=0."""
+    global _index
+    if not SEARCH_INDEX_ENABLED:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex()
+        return _index
@@ -0,0 +1,213 @@
+"""
+Store of generated analysis templates, reused across similar papers.
+Each successfully generated template set is saved with cheap local features
+of its paper: arXiv categories and a MinHash signature of the paper's top
+keywords. A new paper whose estimated keyword similarity to a stored one
+reaches TEMPLATE_REUSE_THRESHOLD (and that shares a category, when both are
+known) reuses those templates instead of spending a model call.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.utils.chunking import overview_context
+
+
+TEMPLATE_REUSE_ENABLED = os.getenv('TEMPLATE_REUSE_ENABLED', '1') != '0'
+TEMPLATE_STORE_PATH = os.getenv('TEMPLATE_STORE_PATH', './pdfs/templates.sqlite3')
+# Estimated Jaccard similarity of the papers' keyword sets needed for reuse
+TEMPLATE_REUSE_THRESHOLD = float(os.getenv('TEMPLATE_REUSE_THRESHOLD', '0.35'))
+
+NUM_KEYWORDS = 64
+NUM_PERMUTATIONS = 64
+# Paper context (in tokens) the keywords are drawn from
+SIGNATURE_CONTEXT_TOKENS = 2000
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME or 1,
+        int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME
+    )
+    for i in range(NUM_PERMUTATIONS)
+]
+
+_WORD = re.compile(r'[a-z][a-z\-]{2,}')
+STOPWORDS = frozenset("""
+about above after again against also among and any are because been before being below between both but can
+could did does doing down during each either et few for from further had has have having here how however into
+its itself just more most much must not now off once only other our ours out over own same should since some such
+than that the their them then there these they this those through thus too under until upon use used using very
+was were what when where whether which while who whom why will with within without would yet you your may might
+paper propose proposed show shows shown work based new results result also two one three first second table figure fig
+abstract introduction conclusion conclusions section sections appendix
+""".split())
+
+
+def keywords(text: str, limit: int = NUM_KEYWORDS) -> List[str]:
+    """Most frequent content words of the text."""
+    counts = Counter(word.strip('-') for word in _WORD.findall(text.lower()) if word not in STOPWORDS)
+    return [word for word, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit] if word]
+
+
+def minhash(words: Sequence[str]) -> List[int]:
+    """MinHash signature of a word set."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'big')
+        for word in set(words)
+    ]
+    if not hashes:
+        return [_MERSENNE_PRIME] * NUM_PERMUTATIONS
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def signature_similarity(left: Sequence[int], right: Sequence[int]) -> float:
+    """Estimated Jaccard similarity: fraction of matching MinHash slots."""
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left) if left else 0.0
+
+
+def paper_signature(paper_text: str) -> List[int]:
+    return minhash(keywords(overview_context(paper_text, SIGNATURE_CONTEXT_TOKENS)))
+
+
+class TemplateStore:
+    """
+    SQLite-backed template sets with an in-memory copy of the signatures,
+    scanned linearly on lookup. On a miss, rows added since by other
+    processes sharing the database are loaded and checked before giving up.
+    """
+
+    def __init__(self, path: str = TEMPLATE_STORE_PATH, threshold: float = TEMPLATE_REUSE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS template_sets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                paper_id TEXT NOT NULL,
+                categories TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                templates TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                uses INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.commit()
+        self._entries: List[Tuple[int, str, frozenset, List[int]]] = []
+        self._refresh()
+
+    def _refresh(self) -> List[Tuple[int, str, frozenset, List[int]]]:
+        """Load rows newer than the newest one seen (e.g. added by another process); returns them."""
+        newest = self._entries[-1][0] if self._entries else 0
+        loaded = [
+            (row_id, paper_id, frozenset(json.loads(categories)), json.loads(signature))
+            for row_id, paper_id, categories, signature in self._conn.execute(
+                "SELECT id, paper_id, categories, signature FROM template_sets WHERE id > ? ORDER BY id", (newest,)
+            )
+        ]
+        self._entries.extend(loaded)
+        return loaded
+
+    def _best_match(
+        self,
+        entries: List[Tuple[int, str, frozenset, List[int]]],
+        signature: List[int],
+        wanted: frozenset
+    ) -> Optional[Tuple[int, str, float]]:
+        best: Optional[Tuple[int, str, float]] = None
+        for row_id, paper_id, stored_categories, stored_signature in entries:
+            if wanted and stored_categories and not wanted & stored_categories:
+                continue
+            similarity = signature_similarity(signature, stored_signature)
+            if similarity >= self.threshold and (best is None or similarity > best[2]):
+                best = (row_id, paper_id, similarity)
+        return best
+
+    def find(
+        self,
+        signature: List[int],
+        categories: Sequence[str] = ()
+    ) -> Optional[Tuple[Dict[str, str], str, float]]:
+        """
+        Best stored match at or above the threshold, as (templates, source
+        paper id, similarity); None when nothing is similar enough.
+        """
+        wanted = frozenset(categories)
+        with self._lock:
+            best = self._best_match(self._entries, signature, wanted)
+            if best is None:
+                best = self._best_match(self._refresh(), signature, wanted)
+            if best is None:
+                self.misses += 1
+                return None
+            row = self._conn.execute("SELECT templates FROM template_sets WHERE id=?", (best[0],)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE template_sets SET uses=uses+1 WHERE id=?", (best[0],))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0]), best[1], best[2]
+
+    def add(
+        self,
+        templates: Dict[str, str],
+        signature: List[int],
+        categories: Sequence[str] = (),
+        paper_id: str = ""
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO template_sets (paper_id, categories, signature, templates, created_at) VALUES (?, ?, ?, ?, ?)",
+                (paper_id, json.dumps(list(categories)), json.dumps(signature), json.dumps(templates), time.time())
+            )
+            self._conn.commit()
+            # Picks up the new row along with any added elsewhere, keeping ids in order for _refresh
+            self._refresh()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM template_sets")
+            self._conn.commit()
+            self._entries = []
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "template_sets": len(self._entries),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+_store: Optional[TemplateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_template_store() -> Optional[TemplateStore]:
+    """Shared store instance, or None when TEMPLATE_REUSE_ENABLED=0."""
+    global _store
+    if not TEMPLATE_REUSE_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = TemplateStore()
+        return _store
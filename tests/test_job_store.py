@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src.utils.job_store import JobStore, LeaseLost
+
+
+PAPER = {"arxiv_id": "2501.00001v1", "title": "A paper", "authors": "Someone", "pdf_url": "http://example/pdf"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.2)
+
+
+def paper_row(store, job_id):
+    return store._conn.execute(
+        "SELECT stage, state, lease_owner FROM job_papers WHERE job_id=? AND position=0", (job_id,)
+    ).fetchone()
+
+
+def test_expired_lease_cannot_overwrite_the_worker_that_took_over(store):
+    job_id = store.create_job([PAPER], {})
+    stalled = store.claim("worker-a")
+    time.sleep(0.3)
+
+    current = store.claim("worker-b")
+    assert current is not None and current.worker_id == "worker-b"
+    store.checkpoint(current, "analyzed", dict(PAPER, note="from b"))
+
+    with pytest.raises(LeaseLost):
+        store.release(stalled, "Error after stage 'pending': stalled")
+    with pytest.raises(LeaseLost):
+        store.checkpoint(stalled, "downloaded", dict(PAPER, note="from a"))
+    with pytest.raises(LeaseLost):
+        store.complete(stalled, {"arxiv_id": PAPER["arxiv_id"], "title": "stale"})
+
+    row = paper_row(store, job_id)
+    assert row["stage"] == "analyzed"
+    assert json.loads(row["state"])["note"] == "from b"
+    assert row["lease_owner"] == "worker-b"
+    # B still holds the paper, so nobody else can claim it
+    assert store.claim("worker-c") is None
+
+    store.complete(current, {"arxiv_id": PAPER["arxiv_id"], "title": PAPER["title"]})
+    assert paper_row(store, job_id)["stage"] == "summarized"
+
+
+def test_expired_lease_nobody_reclaimed_can_still_be_used(store):
+    job_id = store.create_job([PAPER], {})
+    claim = store.claim("worker-a")
+    time.sleep(0.3)
+
+    store.checkpoint(claim, "downloaded", PAPER)
+    assert paper_row(store, job_id)["stage"] == "downloaded"
+
+
+def test_renewed_lease_is_not_reclaimed(store):
+    store.create_job([PAPER], {})
+    claim = store.claim("worker-a")
+    for _ in range(5):
+        time.sleep(0.1)
+        store.renew(claim)
+        assert store.claim("worker-b") is None
+
+
+def test_long_stage_keeps_its_lease(store, monkeypatch):
+    from src.tools import jobs
+
+    def slow_download(paper):
+        time.sleep(0.6)
+        return dict(paper, local_pdf_path="/tmp/paper.pdf")
+
+    monkeypatch.setattr(jobs, "JOB_STAGES", [("downloaded", slow_download)])
+    monkeypatch.setattr(jobs, "_summarize_stage", lambda paper: paper)
+    monkeypatch.setattr(jobs, "_build_paper_result", lambda paper: {"arxiv_id": paper["arxiv_id"]})
+    monkeypatch.setattr(jobs, "store_result", lambda result: result)
+
+    job_id = store.create_job([PAPER], {})
+    claim = store.claim("worker-a")
+    stolen = []
+    thief = threading.Timer(0.4, lambda: stolen.append(store.claim("worker-b")))
+    thief.start()
+    jobs.process_claimed_paper(store, claim)
+    thief.join()
+
+    # The stage ran for three lease periods, but the lease was renewed meanwhile
+    assert stolen == [None]
+    assert paper_row(store, job_id)["stage"] == "summarized"
@@ -0,0 +1,67 @@
+import argparse
+import multiprocessing
+import sys
+import threading
+from typing import Optional, Tuple
+
+from src.utils.env import init_process
+
+# Before any module reads its configuration from the environment
+init_process()
+
+from src.tools.jobs import JOB_SHARD, new_worker_id, parse_shard, run_worker
+from src.utils.job_store import get_job_store
+
+
+def run_threads(threads: int, shard: Optional[Tuple[int, int]], exit_when_idle: bool) -> None:
+    store = get_job_store()
+    stop = threading.Event()
+    workers = [
+        threading.Thread(target=run_worker, args=(store, new_worker_id(), stop, exit_when_idle, shard), name="job-worker")
+        for _ in range(max(1, threads))
+    ]
+    for thread in workers:
+        thread.start()
+    try:
+        for thread in workers:
+            thread.join()
+    except KeyboardInterrupt:
+        stop.set()
+        for thread in workers:
+            thread.join()
+
+
+def main() -> int:
+    """Standalone job worker process; run several alongside the server to share batch jobs."""
+    parser = argparse.ArgumentParser(description="Process queued summarization jobs.")
+    parser.add_argument('--threads', type=int, default=2, help="worker threads per process")
+    parser.add_argument('--processes', type=int, default=1, help="worker processes, each given one shard of the papers")
+    parser.add_argument('--shard', default=JOB_SHARD, help="index/count: prefer this shard of papers (by arXiv ID)")
+    parser.add_argument('--exit-when-idle', action='store_true', help="exit once no unfinished papers remain")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_threads(args.threads, parse_shard(args.shard), args.exit_when_idle)
+        return 0
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=run_threads, args=(args.threads, (index, args.processes), args.exit_when_idle), name=f"job-worker-{index}"
+        )
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Children got the same SIGINT and stop after their current paper
+        for process in processes:
+            process.join()
+    return 0 if all(process.exitcode == 0 for process in processes) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())